@@ -1,16 +1,20 @@
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from typing import Optional, AsyncGenerator
 import json
-import asyncio
 from app.schemas.schema_chat import ChatQuestionRequest, ChatQuestionResponse, ChatAnswerRequest, ChatAnswerResponse
+from app.common.bounded_executor import BoundedExecutor, ExecutorSaturatedError
+from app.common.stream_coalescer import coalesce_content
 from app.controller.controller_chat import ChatController
-from app.config import logger
+from app.config import config, logger
 
 router = APIRouter()
 
 chat_controller = ChatController()
 
+# Blocking controller calls (OpenAI, web search, data analysis) run here instead of on the event loop
+blocking_executor = BoundedExecutor(config.get("BLOCKING_POOL_WORKERS", 16), config.get("BLOCKING_POOL_QUEUE", 64))
+
 
 @router.post("/question", response_model=ChatQuestionResponse)
 async def submit_question(request: ChatQuestionRequest):
@@ -18,8 +22,11 @@ async def submit_question(request: ChatQuestionRequest):
     Submit a chat question for processing
     """
     try:
-        response = chat_controller.process_question(request)
+        # The message store may be a SQLite file, so writes stay off the event loop
+        response = await blocking_executor.run(chat_controller.process_question, request)
         return response
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in submit_question endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -31,8 +38,10 @@ async def get_answer(request: ChatAnswerRequest):
     Get the answer for a previously submitted question
     """
     try:
-        response = chat_controller.generate_answer(request)
+        response = await chat_controller.generate_answer(request, run=blocking_executor.run)
         return response
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in get_answer endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -46,11 +55,15 @@ async def get_answer_stream(request: ChatAnswerRequest):
     try:
         async def generate_stream() -> AsyncGenerator[str, None]:
             try:
-                # Generate streaming response
-                async for chunk in chat_controller.generate_answer_stream(request):
+                # Generate streaming response; token chunks are batched per flush interval instead of sleeping per chunk
+                chunks = coalesce_content(
+                    chat_controller.generate_answer_stream(request, run=blocking_executor.run),
+                    config.get("STREAM_FLUSH_INTERVAL_MS", 30),
+                    config.get("STREAM_FLUSH_MAX_CHARS", 256),
+                )
+                async for chunk in chunks:
                     # Format as Server-Sent Events
                     yield f"data: {json.dumps(chunk)}\n\n"
-                    await asyncio.sleep(0.01)  # Small delay to prevent overwhelming
                 
                 # Send end signal
                 yield f"data: {json.dumps({'type': 'end', 'data': ''})}\n\n"
@@ -95,8 +108,10 @@ async def analyze_market_trend(
     Analyze market trends for specific region and product category
     """
     try:
-        analysis = chat_controller.analyze_market_trend(region, product_category)
+        analysis = await blocking_executor.run(chat_controller.analyze_market_trend, region, product_category)
         return analysis
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in analyze_market_trend endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -112,8 +127,10 @@ async def get_echarts_config(
     Generate ECharts configuration with enhanced styling and multiple chart types
     """
     try:
-        config = chat_controller.get_echarts_config(product_category, title, chart_type)
+        config = await blocking_executor.run(chat_controller.get_echarts_config, product_category, title, chart_type)
         return config
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in get_echarts_config endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -168,8 +185,10 @@ async def search_web_data(
     Search for additional market data using web search
     """
     try:
-        results = chat_controller.search_web_data(query, region, product_category)
+        results = await blocking_executor.run(chat_controller.search_web_data, query, region, product_category)
         return results
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in web search endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -185,8 +204,10 @@ async def get_enhanced_analysis(
     Generate enhanced analysis combining DOCX documents and web search data
     """
     try:
-        analysis = chat_controller.generate_enhanced_analysis(query, region, product_category)
+        analysis = await chat_controller.generate_enhanced_analysis(query, region, product_category, run=blocking_executor.run)
         return analysis
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in enhanced analysis endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -198,8 +219,10 @@ async def get_competitive_analysis(region: Optional[str] = Query(None, descripti
     Get competitive product portfolio and price architecture analysis
     """
     try:
-        analysis = chat_controller.get_competitive_analysis(region)
+        analysis = await blocking_executor.run(chat_controller.get_competitive_analysis, region)
         return analysis
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in competitive analysis endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -228,8 +251,15 @@ async def get_direct_result(
     Get direct result without LLM processing - just chart config and data
     """
     try:
-        result = chat_controller.get_direct_result(category, subcategory, country)
+        # Served straight from the precomputed table when it is current for the loaded corpus
+        body = chat_controller.get_direct_result_body(category, subcategory, country)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+        result = await chat_controller.get_direct_result(category, subcategory, country, run=blocking_executor.run)
         return result
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in direct result endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -258,8 +288,10 @@ async def get_llm_analysis(
     Get LLM analysis with chart config for selected category, subcategory, and country
     """
     try:
-        result = chat_controller.get_llm_analysis(category, subcategory, country)
+        result = await chat_controller.get_llm_analysis(category, subcategory, country, run=blocking_executor.run)
         return result
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in get_llm_analysis endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -276,13 +308,30 @@ async def perform_web_search(request: dict):
             raise HTTPException(status_code=400, detail="Input text is required")
 
         # Use OpenAI's web search tool
-        response = chat_controller.perform_web_search(input_text)
+        response = await blocking_executor.run(chat_controller.perform_web_search, input_text)
         return response
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:
         logger.write_error(f"Error in web search endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Blocking pool load (active workers, queue depth, completed/failed/rejected counts), message store, answer cache and request coalescing counters
+    """
+    answer_cache = chat_controller.openai_handler.answer_cache
+    return {
+        "blocking_pool": blocking_executor.metrics(),
+        "message_store": chat_controller.message_storage.stats(),
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "single_flight": chat_controller.single_flight.stats(),
+        "stream_broadcaster": chat_controller.stream_broadcaster.stats(),
+    }
+
+
 @router.get("/health")
 async def health_check():
     """
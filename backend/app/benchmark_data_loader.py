@@ -0,0 +1,77 @@
+import time
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+from app.common.data_loader import DataLoader
+
+
+def _equals(data: pd.DataFrame, column: str, value: str) -> np.ndarray:
+    """
+    Row mask for data[column] == value on a categorical column, compared as integer codes
+    """
+    series = data[column]
+    code = series.cat.categories.get_indexer([value])[0]
+    if code < 0:
+        return np.zeros(len(series), dtype=bool)
+    return series.cat.codes.to_numpy() == code
+
+
+def _mask_rows(loader: DataLoader, dataset: str, year_from: Optional[int], year_to: Optional[int], **equals: Optional[str]) -> np.ndarray:
+    """
+    Reference path: one full-length boolean mask per filter, combined and turned into row positions
+    """
+    data = loader._get_dataset(dataset)
+    mask = np.ones(len(data), dtype=bool)
+    for column, value in equals.items():
+        if value:
+            mask &= _equals(data, column, value)
+    years = data["year"].to_numpy()
+    if year_from is not None:
+        mask &= years >= year_from
+    if year_to is not None:
+        mask &= years <= year_to
+    return np.flatnonzero(mask)
+
+
+def _time_ms(fn: Callable[[], np.ndarray], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main(repeat: int = 200):
+    """
+    Compare DataLoader's sorted (region, category, sub_category, year) index with full-scan masks.
+    """
+    loader = DataLoader()
+    started = time.perf_counter()
+    loader.load_all_data()
+    print(f"Loaded datasets and built indexes in {time.perf_counter() - started:.3f}s")
+
+    sample = loader.market_trend_data.iloc[len(loader.market_trend_data) // 2]
+    region, category, sub_category, year = sample["region"], sample["category"], sample["sub_category"], int(sample["year"])
+    queries = [
+        ("point", {"region": region, "category": category, "sub_category": sub_category}, year, year),
+        ("prefix: region", {"region": region}, None, None),
+        ("prefix: region + category", {"region": region, "category": category}, None, None),
+        ("range: one sub_category, 2018-2022", {"region": region, "category": category, "sub_category": sub_category}, 2018, 2022),
+        ("gap: sub_category in region", {"region": region, "sub_category": sub_category}, None, None),
+        ("scan: category only", {"category": category}, None, None),
+    ]
+
+    print(f"{'dataset':<12} {'query':<36} {'rows':>6} {'index ms':>9} {'mask ms':>9} {'speedup':>8}")
+    for dataset in ("market_trend", "timeseries"):
+        for label, equals, year_from, year_to in queries:
+            indexed = loader._filter_rows(dataset, year_from, year_to, **equals)
+            scanned = _mask_rows(loader, dataset, year_from, year_to, **equals)
+            if not np.array_equal(indexed, scanned):
+                raise AssertionError(f"Index and mask disagree for {dataset} / {label}")
+
+            index_ms = _time_ms(lambda: loader._filter_rows(dataset, year_from, year_to, **equals), repeat)
+            mask_ms = _time_ms(lambda: _mask_rows(loader, dataset, year_from, year_to, **equals), repeat)
+            print(f"{dataset:<12} {label:<36} {len(indexed):>6} {index_ms:>9.4f} {mask_ms:>9.4f} {mask_ms / index_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import time
+from app.controller.controller_chat import ChatController
+
+
+def main():
+    """
+    Precompute the /data/direct-result table for every category, subcategory and country.
+    """
+    started = time.perf_counter()
+    controller = ChatController()
+    count = controller.build_direct_results()
+
+    print(f"Built {count} direct results in {time.perf_counter() - started:.1f}s")
+    print(f"Table: {controller.direct_results.path} (corpus {controller.direct_results.corpus_hash[:12]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import unicodedata
+from typing import Any, Dict, List, Optional
+from app.common.message_store import MessageStore
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a prompt for cache keys: NFKC (full-width -> half-width) and collapsed whitespace
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def answer_cache_key(model: str, messages: List[Dict[str, str]], system_message: str, max_tokens: int, temperature: float) -> str:
+    """
+    Cache key from the model and its generation parameters, the normalized conversation and a hash of the system
+    prompt with its injected data context
+    """
+    payload = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": [[message.get("role", ""), normalize_text(message.get("content", ""))] for message in messages],
+        "context": hashlib.sha256(system_message.encode("utf-8")).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Completed chat answers keyed by answer_cache_key, on top of a size-bounded message store backend
+    """
+
+    def __init__(self, store: MessageStore):
+        self.store = store
+
+    def get(self, key: str) -> Optional[str]:
+        record = self.store.get(key)
+        return record["answer"] if record else None
+
+    def put(self, key: str, answer: str):
+        if answer:
+            self.store.put(key, {"answer": answer})
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturatedError(Exception):
+    """
+    Raised when every worker is busy and the wait queue is full
+    """
+
+
+class BoundedExecutor:
+    """
+    Size-limited thread pool for running blocking work from async routes
+
+    At most max_workers calls run at once and at most max_queue wait for a worker; anything
+    beyond that is rejected immediately instead of piling up behind a slow upstream
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = "blocking"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool and await its result
+
+        Raises:
+            ExecutorSaturatedError: When the pool and its queue are full
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturatedError(f"Server is busy ({self._in_flight} requests in progress), please retry")
+            self._in_flight += 1
+
+        try:
+            future = self._executor.submit(self._call, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+        # A job cancelled while still queued (e.g. the client disconnected) never reaches _call, so its slot is released here
+        future.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_cancelled(self, future: Future):
+        if future.cancelled():
+            with self._lock:
+                self._in_flight -= 1
+
+    def _call(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        with self._lock:
+            self._active += 1
+
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._in_flight -= 1
+                self._completed += 1
+                self._failed += failed
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Current pool load and lifetime counters
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._in_flight - self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """
+        Stop accepting work and release the worker threads
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,186 @@
+import json
+from typing import Dict, List
+
+_TEXT, _FENCE_INFO, _JSON, _JSON_CLOSE, _CODE = range(5)
+
+
+class ChartBlockParser:
+    """
+    Incremental parser splitting a streamed answer into content events and chart events
+
+    A ```json fenced block whose top-level object has a "chartConfig" key becomes one chart event,
+    emitted as soon as the object's closing brace arrives; everything else, including other JSON
+    blocks, passes through as content. Fences and brace depth are tracked across chunk boundaries
+    and every character is examined once.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._state = _TEXT
+        self._ticks = 0
+        self._info: List[str] = []
+        self._raw: List[str] = []
+        self._json: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Consume the next chunk and return the events it completes, in stream order
+        """
+        events: List[Dict] = []
+        content: List[str] = []
+        i = 0
+        length = len(text)
+
+        while i < length:
+            if self._state == _TEXT:
+                # Plain text is copied in runs; backticks are held back until we know whether they open a fence
+                next_tick = text.find("`", i)
+                if next_tick == -1:
+                    next_tick = length
+                if next_tick > i:
+                    if self._ticks:
+                        content.append("`" * self._ticks)
+                        self._ticks = 0
+                    content.append(text[i:next_tick])
+                    i = next_tick
+                    continue
+
+                self._ticks += 1
+                i += 1
+                if self._ticks == 3:
+                    self._ticks = 0
+                    self._state = _FENCE_INFO
+                    self._info = []
+                    self._raw = ["```"]
+
+            elif self._state == _FENCE_INFO:
+                newline = text.find("\n", i)
+                end = length if newline == -1 else newline + 1
+                self._info.append(text[i:end])
+                self._raw.append(text[i:end])
+                i = end
+                if newline == -1:
+                    continue
+
+                if "".join(self._info).strip().lower() == "json":
+                    self._state = _JSON
+                    self._json = []
+                    self._depth = 0
+                    self._in_string = False
+                    self._escape = False
+                else:
+                    content.append("".join(self._raw))
+                    self._enter_code()
+
+            elif self._state == _JSON:
+                start = i
+                finished = False
+                while i < length and not finished:
+                    char = text[i]
+                    i += 1
+                    if self._in_string:
+                        if self._escape:
+                            self._escape = False
+                        elif char == "\\":
+                            self._escape = True
+                        elif char == '"':
+                            self._in_string = False
+                    elif char == '"':
+                        self._in_string = True
+                    elif char == "{":
+                        self._depth += 1
+                    elif char == "}":
+                        self._depth -= 1
+                        finished = self._depth == 0
+                    elif self._depth == 0 and not char.isspace():
+                        # The fenced block does not start with an object
+                        finished = True
+
+                self._raw.append(text[start:i])
+                self._json.append(text[start:i])
+                if not finished:
+                    continue
+
+                chart = self._parse_chart("".join(self._json))
+                if chart is None:
+                    content.append("".join(self._raw))
+                    self._enter_code()
+                else:
+                    if content:
+                        events.append({"type": "content", "data": "".join(content)})
+                        content = []
+                    events.append({"type": "chart", "data": chart})
+                    self._state = _JSON_CLOSE
+                    self._ticks = 0
+
+            elif self._state == _JSON_CLOSE:
+                # Swallow the closing fence of a chart block
+                char = text[i]
+                i += 1
+                if char == "`":
+                    self._ticks += 1
+                    if self._ticks == 3:
+                        self._ticks = 0
+                        self._state = _TEXT
+                elif not char.isspace() or self._ticks:
+                    # Unexpected text after the chart object: treat the rest of the block as ordinary code
+                    content.append("`" * self._ticks + char)
+                    self._enter_code()
+
+            else:
+                # Inside a non-chart code block: pass through, watching for the closing fence
+                next_tick = text.find("`", i)
+                if next_tick == -1:
+                    content.append(text[i:])
+                    self._ticks = 0
+                    break
+                if next_tick > i:
+                    self._ticks = 0
+                content.append(text[i : next_tick + 1])
+                i = next_tick + 1
+                self._ticks += 1
+                if self._ticks == 3:
+                    self._ticks = 0
+                    self._state = _TEXT
+
+        if content:
+            events.append({"type": "content", "data": "".join(content)})
+        return events
+
+    def close(self) -> List[Dict]:
+        """
+        Flush whatever is still held back at the end of the stream as content
+        """
+        pending = ""
+        if self._state == _TEXT:
+            pending = "`" * self._ticks
+        elif self._state in (_FENCE_INFO, _JSON):
+            # Unterminated block: forward it unchanged
+            pending = "".join(self._raw)
+
+        self._reset()
+        return [{"type": "content", "data": pending}] if pending else []
+
+    def _enter_code(self):
+        self._state = _CODE
+        self._ticks = 0
+        self._raw = []
+        self._json = []
+
+    @staticmethod
+    def _parse_chart(candidate: str):
+        """
+        Validated chart JSON string, or None when the block is not a chart object
+        """
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            return None
+        if not isinstance(parsed, dict) or "chartConfig" not in parsed:
+            return None
+        return json.dumps(parsed, ensure_ascii=False)
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.config import logger
+
+_FORMAT = 1
+
+
+class ColumnarCache:
+    """
+    On-disk columnar copy of CSV files: one .npy file per column plus a JSON manifest
+
+    Numeric columns are memory-mapped read-only, so loading costs no parsing and workers share the
+    pages through the OS cache; string columns are dictionary encoded as int32 codes with their
+    vocabulary in the manifest. A cache entry is rebuilt when the CSV's size or mtime changes.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def read_csv(self, csv_path: str, categories: Optional[Dict[str, pd.CategoricalDtype]] = None) -> pd.DataFrame:
+        """
+        Load a CSV through the cache, converting it first if the cached copy is missing or stale
+
+        String columns named in categories are returned as categoricals of the given dtype, which lets
+        several datasets share one vocabulary (and therefore comparable codes)
+        """
+        categories = categories or {}
+        entry_dir, manifest = self._entry(csv_path)
+        if manifest is None:
+            # No usable cache (e.g. a read-only data directory): fall back to parsing the CSV
+            data = pd.read_csv(csv_path)
+            for name, dtype in categories.items():
+                if name in data.columns:
+                    data[name] = data[name].astype(dtype)
+            return data
+
+        columns = {}
+        for column in manifest["columns"]:
+            # asarray drops the memmap subclass but keeps the mapped buffer
+            values = np.asarray(np.load(os.path.join(entry_dir, column["file"]), mmap_mode="r"))
+            if "vocabulary" in column:
+                dtype = categories.get(column["name"])
+                if dtype is not None:
+                    # Translate file-local codes to the shared vocabulary; code -1 (missing) stays -1
+                    remap = np.append(dtype.categories.get_indexer(column["vocabulary"]), -1).astype(np.int32)
+                    values = pd.Categorical.from_codes(remap[values], dtype=dtype)
+                else:
+                    # Code -1 marks a missing value; the extra trailing slot maps it back to NaN
+                    values = np.array(column["vocabulary"] + [np.nan], dtype=object)[values]
+            columns[column["name"]] = values
+
+        # copy=False keeps the numeric columns on their memory maps instead of consolidating them
+        return pd.DataFrame(columns, copy=False)
+
+    def vocabularies(self, csv_path: str) -> Dict[str, List[str]]:
+        """
+        Distinct non-missing values of every string column, read from the manifest without loading any column
+        """
+        _, manifest = self._entry(csv_path)
+        if manifest is None:
+            data = pd.read_csv(csv_path)
+            return {name: data[name].dropna().unique().astype(str).tolist() for name in data.columns if data[name].dtype == object}
+        return {column["name"]: column["vocabulary"] for column in manifest["columns"] if "vocabulary" in column}
+
+    def _entry(self, csv_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Cache directory and manifest for a CSV, converting the CSV when the cached copy is missing or stale
+
+        The manifest is None when the cache cannot be written
+        """
+        stat = os.stat(csv_path)
+        source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        entry_dir = os.path.join(self.cache_dir, os.path.splitext(os.path.basename(csv_path))[0])
+
+        manifest = self._read_manifest(entry_dir, source)
+        if manifest is not None:
+            return entry_dir, manifest
+
+        try:
+            self._save(entry_dir, pd.read_csv(csv_path), source)
+        except Exception as e:
+            # The cache is an optimization; a read-only data directory must not break loading
+            logger.write_warning(f"Could not write columnar cache for {csv_path}: {str(e)}")
+            return entry_dir, None
+        return entry_dir, self._read_manifest(entry_dir, source)
+
+    def _read_manifest(self, entry_dir: str, source: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.write_warning(f"Ignoring unreadable columnar cache {entry_dir}: {str(e)}")
+            return None
+        if manifest.get("format") != _FORMAT or manifest.get("source") != source:
+            return None
+        return manifest
+
+    def _save(self, entry_dir: str, data: pd.DataFrame, source: Dict[str, int]):
+        # Written next to the final directory and swapped in, so readers never see a partial entry
+        tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        columns = []
+        for position, name in enumerate(data.columns):
+            series = data[name]
+            column: Dict[str, Any] = {"name": name, "file": f"{position}.npy"}
+            if series.dtype == object:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                column["vocabulary"] = [str(value) for value in uniques]
+                values = codes.astype(np.int32)
+            else:
+                values = series.to_numpy()
+            np.save(os.path.join(tmp_dir, column["file"]), values, allow_pickle=False)
+            columns.append(column)
+
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"format": _FORMAT, "source": source, "rows": len(data), "columns": columns}, f, ensure_ascii=False)
+
+        old_dir = f"{entry_dir}.{os.getpid()}.old"
+        if os.path.exists(entry_dir):
+            os.replace(entry_dir, old_dir)
+        os.replace(tmp_dir, entry_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
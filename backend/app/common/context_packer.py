@@ -0,0 +1,93 @@
+import math
+from typing import Any, Dict, List, Tuple
+from app.common.search_index import _CJK_PATTERN
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast token estimate: one token per Japanese character, one per four characters of anything else
+    """
+    cjk = sum(len(run) for run in _CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _truncate_to_tokens(text: str, limit: int) -> str:
+    """
+    Longest prefix of text whose estimated token count stays within limit
+    """
+    used = 0.0
+    for i, char in enumerate(text):
+        used += 1.0 if _CJK_PATTERN.match(char) else 0.25
+        if used > limit:
+            return text[:i]
+    return text
+
+
+def _merge_spans(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Union of two overlapping or adjacent passages of the same document
+    """
+    first, second = sorted((first, second), key=lambda passage: passage["start"])
+    if second["end"] <= first["end"]:
+        return first
+    return {**first, "text": first["text"] + second["text"][first["end"] - second["start"] :], "end": second["end"]}
+
+
+def format_passage(passage: Dict[str, Any]) -> str:
+    """
+    Prompt rendering of a packed passage: document label followed by its text
+    """
+    return f"\n**{passage['document']}**:\n{passage['text']}\n"
+
+
+def pack_passages(passages: List[Dict[str, Any]], budget: int, min_tokens: int = 40) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Fill a token budget with ranked passages
+
+    Costs include the document label added by format_passage. Overlapping spans of the same document
+    are merged so shared text is only paid for once; the last
+    passage that does not fit is cut to the remaining budget unless fewer than min_tokens remain.
+
+    Args:
+        passages: Ranked passages (best first) with document, text, start and end keys
+
+    Returns:
+        (packed passages in rank order, estimated tokens used)
+    """
+    packed: List[Dict[str, Any]] = []
+    costs: List[int] = []
+    used = 0
+
+    for passage in passages:
+        overlapping = next(
+            (
+                i
+                for i, chosen in enumerate(packed)
+                if chosen["document"] == passage["document"] and passage["start"] <= chosen["end"] and chosen["start"] <= passage["end"]
+            ),
+            None,
+        )
+
+        if overlapping is not None:
+            merged = _merge_spans(packed[overlapping], passage)
+            cost = estimate_tokens(format_passage(merged))
+            if used - costs[overlapping] + cost <= budget:
+                used += cost - costs[overlapping]
+                packed[overlapping], costs[overlapping] = merged, cost
+            continue
+
+        cost = estimate_tokens(format_passage(passage))
+        remaining = budget - used
+        if cost > remaining:
+            label_cost = cost - estimate_tokens(passage["text"])
+            if remaining - label_cost < min_tokens:
+                break
+            passage = {**passage, "text": _truncate_to_tokens(passage["text"], remaining - label_cost - 1)}
+            passage["end"] = passage["start"] + len(passage["text"])
+            cost = estimate_tokens(format_passage(passage))
+
+        packed.append(passage)
+        costs.append(cost)
+        used += cost
+
+    return packed, used
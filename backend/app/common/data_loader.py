@@ -1,59 +1,204 @@
+import numpy as np
 import pandas as pd
 import os
+import threading
 from typing import Dict, List, Optional, Any
+from app.common.columnar_cache import ColumnarCache
+from app.common.key_index import SortedKeyIndex
+from app.common.market_cube import MarketCube
 from app.config import logger
 
 
+# Dataset name -> CSV file in the data directory
+_DATASET_FILES = {
+    "market_intelligence": "market_intelligence_2015_2028.csv",
+    "market_trend": "market_trend_product_country_2015_2028.csv",
+    "timeseries": "timeseries_subcategory_region_2015_2035.csv",
+}
+
+# String columns loaded as categoricals; each shares one vocabulary across all datasets
+_CATEGORICAL_COLUMNS = ("region", "category", "sub_category", "key_driver")
+
+# Leading key columns of each dataset's sorted index (those present in the dataset), followed by year
+_INDEX_COLUMNS = ("region", "category", "sub_category")
+
+# Chart regions, in display order
+_STANDARD_REGIONS = ("North America", "Europe", "Asia Pacific", "Latin America", "MEA")
+
+# Country -> standard region; anything else counts as "Other"
+_REGION_MAPPING = {
+    "USA": "North America",
+    "Canada": "North America",
+    "Germany": "Europe",
+    "France": "Europe",
+    "United Kingdom": "Europe",
+    "Italy": "Europe",
+    "Spain": "Europe",
+    "Netherlands": "Europe",
+    "Sweden": "Europe",
+    "Norway": "Europe",
+    "Denmark": "Europe",
+    "Finland": "Europe",
+    "Austria": "Europe",
+    "Belgium": "Europe",
+    "Switzerland": "Europe",
+    "Poland": "Europe",
+    "Czech Republic": "Europe",
+    "Hungary": "Europe",
+    "Greece": "Europe",
+    "Portugal": "Europe",
+    "Ireland": "Europe",
+    "Luxembourg": "Europe",
+    "China": "Asia Pacific",
+    "Japan": "Asia Pacific",
+    "South Korea": "Asia Pacific",
+    "India": "Asia Pacific",
+    "Australia": "Asia Pacific",
+    "Singapore": "Asia Pacific",
+    "Thailand": "Asia Pacific",
+    "Malaysia": "Asia Pacific",
+    "Indonesia": "Asia Pacific",
+    "Philippines": "Asia Pacific",
+    "Vietnam": "Asia Pacific",
+    "Taiwan": "Asia Pacific",
+    "Brazil": "Latin America",
+    "Mexico": "Latin America",
+    "Argentina": "Latin America",
+    "Chile": "Latin America",
+    "Colombia": "Latin America",
+    "Peru": "Latin America",
+    "UAE": "MEA",
+    "Saudi Arabia": "MEA",
+    "South Africa": "MEA",
+    "Egypt": "MEA",
+    "Turkey": "MEA",
+    "Israel": "MEA",
+}
+
+
 class DataLoader:
     """
     Data loader service for handling CSV files containing market intelligence data
+
+    Each dataset is loaded on first access through a columnar cache under data/.cache/columns.
+    Region, category, sub-category and key driver columns are categoricals with a vocabulary shared
+    by all datasets, so filters compare integer codes. Each dataset also gets a sorted index over
+    (region, category, sub_category, year) for point, prefix and year range lookups, and the market
+    trend dataset is pre-aggregated into a MarketCube for the stacked bar chart.
     """
 
     def __init__(self):
         self.data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-        self.market_intelligence_data = None
-        self.market_trend_data = None
-        self.timeseries_data = None
+        self.columnar_cache = ColumnarCache(os.path.join(self.data_dir, ".cache", "columns"))
+        self._datasets: Dict[str, pd.DataFrame] = {}
+        self._indexes: Dict[str, SortedKeyIndex] = {}
+        self._market_cube: Optional[MarketCube] = None
+        self._categories: Optional[Dict[str, pd.CategoricalDtype]] = None
+        self._lock = threading.RLock()
+
+    @property
+    def market_intelligence_data(self) -> pd.DataFrame:
+        return self._get_dataset("market_intelligence")
+
+    @property
+    def market_trend_data(self) -> pd.DataFrame:
+        return self._get_dataset("market_trend")
+
+    @property
+    def timeseries_data(self) -> pd.DataFrame:
+        return self._get_dataset("timeseries")
+
+    @property
+    def market_cube(self) -> MarketCube:
+        self._get_dataset("market_trend")
+        return self._market_cube
+
+    def _get_dataset(self, name: str) -> pd.DataFrame:
+        """
+        Return a dataset, loading it on first use
+        """
+        data = self._datasets.get(name)
+        if data is None:
+            with self._lock:
+                data = self._datasets.get(name)
+                if data is None:
+                    data = self._load_dataset(name)
+                    self._indexes[name] = self._build_index(data)
+                    if name == "market_trend":
+                        self._market_cube = MarketCube.build(data, _REGION_MAPPING, _STANDARD_REGIONS)
+                    self._datasets[name] = data
+        return data
 
-    def load_all_data(self) -> Dict[str, pd.DataFrame]:
+    @staticmethod
+    def _build_index(data: pd.DataFrame) -> SortedKeyIndex:
+        return SortedKeyIndex(data, [column for column in _INDEX_COLUMNS if column in data.columns], "year")
+
+    def _shared_categories(self) -> Dict[str, pd.CategoricalDtype]:
         """
-        Load all CSV files into memory
+        One sorted CategoricalDtype per categorical column, covering the values of every dataset
         """
+        with self._lock:
+            if self._categories is None:
+                values: Dict[str, set] = {column: set() for column in _CATEGORICAL_COLUMNS}
+                for file_name in _DATASET_FILES.values():
+                    for column, vocabulary in self.columnar_cache.vocabularies(os.path.join(self.data_dir, file_name)).items():
+                        if column in values:
+                            values[column].update(vocabulary)
+                self._categories = {column: pd.CategoricalDtype(sorted(vocabulary)) for column, vocabulary in values.items()}
+            return self._categories
+
+    def _load_dataset(self, name: str) -> pd.DataFrame:
         try:
-            # Load market intelligence data
-            intelligence_path = os.path.join(self.data_dir, "market_intelligence_2015_2028.csv")
-            self.market_intelligence_data = pd.read_csv(intelligence_path)
-
-            # Load market trend data
-            trend_path = os.path.join(self.data_dir, "market_trend_product_country_2015_2028.csv")
-            self.market_trend_data = pd.read_csv(trend_path)
+            return self.columnar_cache.read_csv(os.path.join(self.data_dir, _DATASET_FILES[name]), self._shared_categories())
+        except Exception as e:
+            logger.write_error(f"Error loading {name} data: {str(e)}")
+            raise Exception(f"Failed to load data: {str(e)}") from e
 
-            # Load timeseries data
-            timeseries_path = os.path.join(self.data_dir, "timeseries_subcategory_region_2015_2035.csv")
-            self.timeseries_data = pd.read_csv(timeseries_path)
+    def load_all_data(self) -> Dict[str, pd.DataFrame]:
+        """
+        Load (or reload) all CSV files into memory
+        """
+        try:
+            with self._lock:
+                self._categories = None
+                datasets = {name: self._load_dataset(name) for name in _DATASET_FILES}
+                self._indexes = {name: self._build_index(data) for name, data in datasets.items()}
+                self._market_cube = MarketCube.build(datasets["market_trend"], _REGION_MAPPING, _STANDARD_REGIONS)
+                self._datasets = datasets
 
             logger.write_msg("All data files loaded successfully")
 
-            return {"market_intelligence": self.market_intelligence_data, "market_trend": self.market_trend_data, "timeseries": self.timeseries_data}
+            return dict(datasets)
 
         except Exception as e:
             logger.write_error(f"Error loading data files: {str(e)}")
             raise Exception(f"Failed to load data: {str(e)}") from e
 
+    def get_memory_usage(self) -> Dict[str, int]:
+        """
+        In-memory size in bytes of each loaded dataset, including string contents
+        """
+        return {name: int(data.memory_usage(deep=True).sum()) for name, data in self._datasets.items()}
+
+    @staticmethod
+    def _contains(data: pd.DataFrame, column: str, query_lower: str) -> np.ndarray:
+        """
+        Row mask for a case-insensitive substring match, evaluated once per category instead of once per row
+        """
+        series = data[column]
+        # The trailing False is picked up by code -1 (missing values)
+        matches = np.append(np.asarray(series.cat.categories.str.lower().str.contains(query_lower), dtype=bool), False)
+        return matches[series.cat.codes.to_numpy()]
+
     def get_available_regions(self) -> List[str]:
         """
         Get list of available regions from all datasets
         """
         regions = set()
 
-        if self.market_intelligence_data is not None:
-            regions.update(self.market_intelligence_data["region"].unique())
-
-        if self.market_trend_data is not None:
-            regions.update(self.market_trend_data["region"].unique())
-
-        if self.timeseries_data is not None:
-            regions.update(self.timeseries_data["region"].unique())
+        regions.update(self.market_intelligence_data["region"].unique())
+        regions.update(self.market_trend_data["region"].unique())
+        regions.update(self.timeseries_data["region"].unique())
 
         # Remove 'region' header if it exists
         regions.discard("region")
@@ -65,11 +210,8 @@ class DataLoader:
         """
         categories = set()
 
-        if self.market_trend_data is not None:
-            categories.update(self.market_trend_data["category"].unique())
-
-        if self.timeseries_data is not None:
-            categories.update(self.timeseries_data["category"].unique())
+        categories.update(self.market_trend_data["category"].unique())
+        categories.update(self.timeseries_data["category"].unique())
 
         # Remove 'category' header if it exists
         categories.discard("category")
@@ -81,91 +223,92 @@ class DataLoader:
         """
         subcategories = set()
 
-        if self.market_trend_data is not None:
-            subcategories.update(self.market_trend_data["sub_category"].unique())
-
-        if self.timeseries_data is not None:
-            subcategories.update(self.timeseries_data["sub_category"].unique())
+        subcategories.update(self.market_trend_data["sub_category"].unique())
+        subcategories.update(self.timeseries_data["sub_category"].unique())
 
         # Remove 'sub_category' header if it exists and empty values
         subcategories.discard("sub_category")
         subcategories.discard("")
         return sorted(list(subcategories))
 
-    def get_market_intelligence_data(self, region: Optional[str] = None, year: Optional[int] = None) -> pd.DataFrame:
-        """
-        Get market intelligence data filtered by region and/or year
+    @staticmethod
+    def _select(data: pd.DataFrame, rows: Optional[np.ndarray], columns: Optional[List[str]]) -> pd.DataFrame:
         """
-        if self.market_intelligence_data is None:
-            self.load_all_data()
-
-        data = self.market_intelligence_data.copy()
+        Copy of the given rows (positions or a boolean mask) and columns of a dataset
 
-        if region:
-            data = data[data["region"] == region]
-
-        if year:
-            data = data[data["year"] == year]
+        Only the selected rows and columns are materialized, in a single take. The result never shares
+        memory with the dataset, which is shared between requests and partly memory-mapped read-only,
+        so callers may modify it freely.
+        """
+        if rows is None:
+            return data.copy() if columns is None else data[columns].copy()
+        if columns is None:
+            return data.iloc[rows]
+        return data.iloc[rows, data.columns.get_indexer(columns)]
+
+    def _filter_rows(
+        self, name: str, year_from: Optional[int] = None, year_to: Optional[int] = None, **equals: Optional[str]
+    ) -> Optional[np.ndarray]:
+        """
+        Ascending positions of the rows matching every filter through the dataset's index; None when nothing is filtered
+        """
+        self._get_dataset(name)
+        if not any(equals.values()) and year_from is None and year_to is None:
+            return None
+        return self._indexes[name].lookup(equals, year_from, year_to)
+
+    def lookup(
+        self,
+        dataset: str,
+        region: Optional[str] = None,
+        product_category: Optional[str] = None,
+        sub_category: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Rows of a dataset ("market_intelligence", "market_trend" or "timeseries") matching the given keys and inclusive year range
+        """
+        rows = self._filter_rows(dataset, year_from, year_to, region=region, category=product_category, sub_category=sub_category)
+        return self._select(self._get_dataset(dataset), rows, columns)
 
-        return data
+    def get_market_intelligence_data(self, region: Optional[str] = None, year: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Get market intelligence data filtered by region and/or year
+        """
+        return self.lookup("market_intelligence", region, year_from=year or None, year_to=year or None, columns=columns)
 
     def get_market_trend_data(
-        self, region: Optional[str] = None, product_category: Optional[str] = None, year: Optional[int] = None, sub_category: Optional[str] = None
+        self,
+        region: Optional[str] = None,
+        product_category: Optional[str] = None,
+        year: Optional[int] = None,
+        sub_category: Optional[str] = None,
+        columns: Optional[List[str]] = None,
     ) -> pd.DataFrame:
         """
         Get market trend data filtered by region, product category, subcategory, and/or year
         """
-        if self.market_trend_data is None:
-            self.load_all_data()
-
-        data = self.market_trend_data.copy()
-
-        if region:
-            data = data[data["region"] == region]
-
-        if product_category:
-            data = data[data["category"] == product_category]
-
-        if sub_category:
-            data = data[data["sub_category"] == sub_category]
-
-        if year:
-            data = data[data["year"] == year]
-
-        return data
+        return self.lookup("market_trend", region, product_category, sub_category, year or None, year or None, columns)
 
     def get_timeseries_data(
-        self, region: Optional[str] = None, product_category: Optional[str] = None, year: Optional[int] = None, sub_category: Optional[str] = None
+        self,
+        region: Optional[str] = None,
+        product_category: Optional[str] = None,
+        year: Optional[int] = None,
+        sub_category: Optional[str] = None,
+        columns: Optional[List[str]] = None,
     ) -> pd.DataFrame:
         """
         Get timeseries data filtered by region, product category, subcategory, and/or year
         """
-        if self.timeseries_data is None:
-            self.load_all_data()
-
-        data = self.timeseries_data.copy()
-
-        if region:
-            data = data[data["region"] == region]
-
-        if product_category:
-            data = data[data["category"] == product_category]
-
-        if sub_category:
-            data = data[data["sub_category"] == sub_category]
-
-        if year:
-            data = data[data["year"] == year]
-
-        return data
+        return self.lookup("timeseries", region, product_category, sub_category, year or None, year or None, columns)
 
     def get_data_summary(self) -> Dict[str, Any]:
         """
         Get a summary of all available data
         """
-        if self.market_intelligence_data is None:
-            self.load_all_data()
-
         return {
             "market_intelligence": {
                 "total_records": len(self.market_intelligence_data),
@@ -195,31 +338,28 @@ class DataLoader:
         """
         Search across all datasets for records matching the query
         """
-        if self.market_intelligence_data is None:
-            self.load_all_data()
-
         results = {}
         query_lower = query.lower()
 
         # Search in market intelligence data
-        intelligence_mask = self.market_intelligence_data["region"].str.lower().str.contains(query_lower, na=False)
+        intelligence_mask = self._contains(self.market_intelligence_data, "region", query_lower)
         if intelligence_mask.any():
             results["market_intelligence"] = self.market_intelligence_data[intelligence_mask].head(limit)
 
         # Search in market trend data
         trend_mask = (
-            self.market_trend_data["region"].str.lower().str.contains(query_lower, na=False)
-            | self.market_trend_data["category"].str.lower().str.contains(query_lower, na=False)
-            | self.market_trend_data["sub_category"].str.lower().str.contains(query_lower, na=False)
+            self._contains(self.market_trend_data, "region", query_lower)
+            | self._contains(self.market_trend_data, "category", query_lower)
+            | self._contains(self.market_trend_data, "sub_category", query_lower)
         )
         if trend_mask.any():
             results["market_trend"] = self.market_trend_data[trend_mask].head(limit)
 
         # Search in timeseries data
         timeseries_mask = (
-            self.timeseries_data["region"].str.lower().str.contains(query_lower, na=False)
-            | self.timeseries_data["category"].str.lower().str.contains(query_lower, na=False)
-            | self.timeseries_data["sub_category"].str.lower().str.contains(query_lower, na=False)
+            self._contains(self.timeseries_data, "region", query_lower)
+            | self._contains(self.timeseries_data, "category", query_lower)
+            | self._contains(self.timeseries_data, "sub_category", query_lower)
         )
         if timeseries_mask.any():
             results["timeseries"] = self.timeseries_data[timeseries_mask].head(limit)
@@ -231,106 +371,23 @@ class DataLoader:
         Prepare data for ECharts stacked bar chart showing market size by region over time
         """
         try:
-            if self.market_trend_data is None:
-                self.load_all_data()
-
-            # Filter data by product category if specified
-            data = self.market_trend_data.copy()
-            if product_category:
-                data = data[data["category"] == product_category]
-
-            # Filter by years if specified
-            if years:
-                data = data[data["year"].isin(years)]
-            else:
-                # Default to 2018-2030 range
-                data = data[data["year"].between(2018, 2030)]
-
-            # Group by year and region, sum market values
-            chart_data = data.groupby(["year", "region"])["market_value_usd_billions"].sum().reset_index()
-
-            # Define region mapping to standard regions
-            region_mapping = {
-                "USA": "North America",
-                "Canada": "North America",
-                "Germany": "Europe",
-                "France": "Europe",
-                "United Kingdom": "Europe",
-                "Italy": "Europe",
-                "Spain": "Europe",
-                "Netherlands": "Europe",
-                "Sweden": "Europe",
-                "Norway": "Europe",
-                "Denmark": "Europe",
-                "Finland": "Europe",
-                "Austria": "Europe",
-                "Belgium": "Europe",
-                "Switzerland": "Europe",
-                "Poland": "Europe",
-                "Czech Republic": "Europe",
-                "Hungary": "Europe",
-                "Greece": "Europe",
-                "Portugal": "Europe",
-                "Ireland": "Europe",
-                "Luxembourg": "Europe",
-                "China": "Asia Pacific",
-                "Japan": "Asia Pacific",
-                "South Korea": "Asia Pacific",
-                "India": "Asia Pacific",
-                "Australia": "Asia Pacific",
-                "Singapore": "Asia Pacific",
-                "Thailand": "Asia Pacific",
-                "Malaysia": "Asia Pacific",
-                "Indonesia": "Asia Pacific",
-                "Philippines": "Asia Pacific",
-                "Vietnam": "Asia Pacific",
-                "Taiwan": "Asia Pacific",
-                "Brazil": "Latin America",
-                "Mexico": "Latin America",
-                "Argentina": "Latin America",
-                "Chile": "Latin America",
-                "Colombia": "Latin America",
-                "Peru": "Latin America",
-                "UAE": "MEA",
-                "Saudi Arabia": "MEA",
-                "South Africa": "MEA",
-                "Egypt": "MEA",
-                "Turkey": "MEA",
-                "Israel": "MEA",
-            }
-
-            # Map regions to standard regions
-            chart_data["Standard_Region"] = chart_data["region"].map(region_mapping).fillna("Other")
-
-            # Group by year and standard region
-            chart_data = chart_data.groupby(["year", "Standard_Region"])["market_value_usd_billions"].sum().reset_index()
-
-            # Pivot to get regions as columns
-            pivot_data = chart_data.pivot(index="year", columns="Standard_Region", values="market_value_usd_billions").fillna(0)
-
-            # Ensure we have all standard regions
-            standard_regions = ["North America", "Europe", "Asia Pacific", "Latin America", "MEA"]
-            for region in standard_regions:
-                if region not in pivot_data.columns:
-                    pivot_data[region] = 0
-
-            # Reorder columns
-            pivot_data = pivot_data[standard_regions]
-
-            # Prepare years list
-            years_list = sorted(pivot_data.index.tolist())
+            # Slice the precomputed cube; default to the 2018-2030 range
+            years_list, values = self.market_cube.slice("market_value", product_category, years or range(2018, 2031))
             years_str = [str(year) for year in years_list]
 
+            # The cube's last region is "Other", which the chart leaves out
+            pivot_data = values[:, : len(_STANDARD_REGIONS)]
+
             # Prepare series data
             series_data = []
             colors = {"North America": "#4A90E2", "Europe": "#7ED321", "Asia Pacific": "#F5A623", "Latin America": "#D0021B", "MEA": "#9013FE"}
 
-            for region in standard_regions:
+            for position, region in enumerate(_STANDARD_REGIONS):
                 series_data.append(
-                    {"name": region, "type": "bar", "stack": "total", "data": pivot_data[region].tolist(), "itemStyle": {"color": colors[region]}}
+                    {"name": region, "type": "bar", "stack": "total", "data": pivot_data[:, position].tolist(), "itemStyle": {"color": colors[region]}}
                 )
 
-            return {"years": years_str, "series": series_data, "regions": standard_regions, "total_market_values": pivot_data.sum(axis=1).tolist()}
+            return {"years": years_str, "series": series_data, "regions": list(_STANDARD_REGIONS), "total_market_values": pivot_data.sum(axis=1).tolist()}
 
         except Exception as e:
             logger.write_error(f"Error preparing stacked bar chart data: {str(e)}")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.common.index_store import load_arrays, save_arrays
+from app.common.search_index import _WORD_PATTERN, tokenize
+
+
+class HashingEmbedder:
+    """
+    Offline text embedder: signed feature hashing of words, word trigrams and Japanese bigrams into a fixed-size vector
+
+    Hashing uses crc32 rather than hash() so vectors are stable across processes and can be persisted
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def features(self, text: str) -> Counter:
+        counts = Counter()
+        for token, _ in tokenize(text.lower()):
+            counts[token] += 1
+            # Character trigrams let inflections ("refrigerator"/"refrigerators") share most features
+            if _WORD_PATTERN.fullmatch(token) and len(token) > 3:
+                padded = f"#{token}#"
+                counts.update(f"#3{padded[i : i + 3]}" for i in range(len(padded) - 2))
+        return counts
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into an L2-normalized float32 matrix of shape (len(texts), dim)
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                hashed = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if hashed & 0x80000000 else -1.0
+                matrix[row, hashed % self.dim] += sign * (1.0 + np.log(count))
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class DenseIndex:
+    """
+    Passage vectors in a contiguous float32 matrix, searchable by brute force or through an IVF (k-means) partition
+    """
+
+    def __init__(
+        self,
+        passages: List[Tuple[str, int, int]],
+        vectors: np.ndarray,
+        centroids: Optional[np.ndarray] = None,
+        list_offsets: Optional[np.ndarray] = None,
+        list_ids: Optional[np.ndarray] = None,
+    ):
+        self.passages = passages
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    @classmethod
+    def build(cls, passages: List[Tuple[str, int, int]], vectors: np.ndarray, nlist: int = 0, iterations: int = 10) -> "DenseIndex":
+        """
+        Build an index; nlist > 0 additionally clusters the vectors into an inverted file of nlist lists
+        """
+        index = cls(passages, np.ascontiguousarray(vectors, dtype=np.float32))
+        if 0 < nlist < len(passages):
+            index._train_ivf(nlist, iterations)
+        return index
+
+    def _train_ivf(self, nlist: int, iterations: int):
+        """
+        Spherical k-means over the passage vectors, then group passage ids by nearest centroid
+        """
+        rng = np.random.default_rng(0)
+        centroids = self.vectors[rng.choice(len(self.vectors), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = self.vectors[assignments == cluster]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.list_ids = np.argsort(assignments, kind="stable").astype(np.int32)
+        self.list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=self.list_offsets[1:])
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5, nprobe: int = 0, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Return up to top_k (passage id, cosine similarity) pairs, best first
+
+        nprobe > 0 scans only the passages of the nprobe nearest IVF lists; otherwise all passages are scored.
+        `allowed` is an optional boolean mask over passages
+        """
+        if not self.passages or top_k <= 0:
+            return []
+
+        if nprobe > 0 and self.centroids is not None:
+            lists = np.argsort(-(self.centroids @ query_vector))[:nprobe]
+            candidates = np.concatenate([self.list_ids[self.list_offsets[i] : self.list_offsets[i + 1]] for i in lists])
+        else:
+            candidates = np.arange(len(self.passages))
+
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        if not len(candidates):
+            return []
+
+        scores = self.vectors[candidates] @ query_vector
+        positive = scores > 0
+        candidates, scores = candidates[positive], scores[positive]
+        if len(candidates) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            candidates, scores = candidates[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def save(self, directory: str, fingerprint: str):
+        """
+        Persist the index as .npy arrays plus a JSON manifest carrying the corpus fingerprint
+        """
+        arrays = {"vectors": self.vectors}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+        save_arrays(directory, fingerprint, arrays, {"passages": self.passages})
+
+    @classmethod
+    def load(cls, directory: str, fingerprint: str) -> Optional["DenseIndex"]:
+        """
+        Memory-map a persisted index; returns None when it is missing or was built from a different corpus
+        """
+        loaded = load_arrays(directory, fingerprint)
+        if loaded is None:
+            return None
+
+        arrays, manifest = loaded
+        passages = [tuple(passage) for passage in manifest["passages"]]
+        return cls(passages, **arrays)
+
+
+def corpus_fingerprint(fingerprints: Dict[str, Tuple[int, int]], *params) -> str:
+    """
+    Stable hash of the document fingerprints (size, mtime) and the index parameters
+    """
+    payload = json.dumps([sorted(fingerprints.items()), params])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,116 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.config import logger
+
+_FORMAT = 1
+
+
+def _dumps(value: Any) -> str:
+    # Same settings as FastAPI's JSONResponse, so precomputed bodies are encoded exactly like computed responses
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+
+
+class DirectResultTable:
+    """
+    Precomputed /data/direct-result response bodies for every category x subcategory x country
+
+    Each top-level field is serialized once and shared between combinations (the competitive analysis
+    of a country, the chart of a category, ...), so the table stays small; a lookup only joins the
+    pre-serialized pieces of one entry
+
+    A body has the same fields and encoding as a freshly computed response; only metadata.timings_ms
+    differs, since it records the stage timings measured when the table entry was built
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.corpus_hash: Optional[str] = None
+        self._fragments: List[str] = []
+        self._entries: Dict[Tuple[str, str, str], List[Tuple[str, int]]] = {}
+        self._bodies: Dict[Tuple[str, str, str], List[bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, results: Dict[Tuple[str, str, str], Dict[str, Any]], corpus_hash: str):
+        """
+        Replace the table with serialized results keyed by (category, subcategory, country)
+        """
+        fragment_ids: Dict[str, int] = {}
+        self._fragments = []
+        self._entries = {}
+
+        for key, result in results.items():
+            fields = []
+            for name, value in jsonable_encoder(result).items():
+                fragment = _dumps(value)
+                if fragment not in fragment_ids:
+                    fragment_ids[fragment] = len(self._fragments)
+                    self._fragments.append(fragment)
+                fields.append((name, fragment_ids[fragment]))
+            self._entries[key] = fields
+
+        self.corpus_hash = corpus_hash
+        self._assemble()
+
+    def lookup(self, category: str, subcategory: str, country: str) -> Optional[bytes]:
+        """
+        Serialized JSON body for a combination, or None when it was not precomputed
+        """
+        parts = self._bodies.get((category, subcategory, country))
+        return b"".join(parts) if parts is not None else None
+
+    def save(self):
+        """
+        Write the table atomically as JSON
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {
+            "format": _FORMAT,
+            "corpus_hash": self.corpus_hash,
+            "fragments": self._fragments,
+            "entries": [[*key, fields] for key, fields in self._entries.items()],
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        logger.write_msg(f"Direct result table written: {len(self._entries)} combinations, {len(self._fragments)} shared fragments")
+
+    def load(self) -> bool:
+        """
+        Load a table written by save(); returns False when there is no usable file
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != _FORMAT:
+                return False
+
+            self.corpus_hash = data["corpus_hash"]
+            self._fragments = data["fragments"]
+            self._entries = {(category, subcategory, country): [tuple(field) for field in fields] for category, subcategory, country, fields in data["entries"]}
+            self._assemble()
+            return True
+        except Exception as e:
+            logger.write_error(f"Error loading direct result table {self.path}: {str(e)}")
+            return False
+
+    def _assemble(self):
+        """
+        Pre-encode each entry as a list of byte pieces that reference the shared fragments
+        """
+        encoded = [fragment.encode("utf-8") for fragment in self._fragments]
+        self._bodies = {}
+        for key, fields in self._entries.items():
+            parts = []
+            for position, (name, fragment_id) in enumerate(fields):
+                parts.append(("{" if position == 0 else ",").encode("utf-8") + _dumps(name).encode("utf-8") + b":")
+                parts.append(encoded[fragment_id])
+            parts.append(b"}" if fields else b"{}")
+            self._bodies[key] = parts
@@ -1,8 +1,127 @@
+import copy
+import json
+import multiprocessing
 import os
 import re
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
 from docx import Document
-from app.config import logger
+from app.config import config, logger
+from app.common.dense_index import DenseIndex, HashingEmbedder, corpus_fingerprint
+from app.common.docx_snapshot import DocxSnapshotCache
+from app.common.docx_tables import DocxTable, extract_tables
+from app.common.passage_index import BM25Index
+from app.common.search_index import InvertedIndex
+from app.common.sentence_index import SentenceIndex
+
+
+# Spawned pool workers re-import the app before parsing anything, which costs far more than parsing a file;
+# the pool is only worth it when every worker gets at least this many files
+_POOL_MIN_FILES_PER_WORKER = 8
+
+# Snapshot fields of a file that could not be parsed: it stays in the corpus as an empty document
+_EMPTY_FIELDS = {"text": "", "tables": "[]"}
+
+
+def _parse_docx_file(file_path: str) -> Tuple[Dict[str, str], float]:
+    """
+    Parse a DOCX file into snapshot fields (paragraph text, tables as JSON) and the parse time in seconds
+
+    Module-level so it can run inside ProcessPoolExecutor workers
+    """
+    started = time.perf_counter()
+    doc = Document(file_path)
+    content = []
+
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            content.append(paragraph.text.strip())
+
+    fields = {"text": "\n".join(content), "tables": json.dumps(extract_tables(doc), ensure_ascii=False)}
+    return fields, time.perf_counter() - started
+
+
+_BRANDS = ["Samsung", "LG", "Panasonic", "Daikin", "Casper", "Hitachi", "Sharp", "Toshiba"]
+_SOURCES = ["TechSci", "IMARC", "Markets&Data", "GVR", "Grand View", "6W", "Credence", "Euromonitor", "Statista"]
+_MARKET_TRIGGERS = ["CAGR", "市場規模", "TAM"]
+_PILLAR_KEYWORDS = {
+    "Population & Households": ["population", "household", "demographic", "family"],
+    "Society & Economy": ["economy", "society", "social", "economic", "gdp", "income"],
+    "Science & Technology": ["technology", "innovation", "digital", "smart", "iot", "ai"],
+    "City & Nature": ["city", "urban", "nature", "environment", "sustainability", "green"],
+}
+_PILLAR_KEYWORD_LIST = [keyword for keywords in _PILLAR_KEYWORDS.values() for keyword in keywords]
+
+# One alternation finds price ranges, brands, data sources and section triggers in a single pass.
+# It only differs from separate scans when a price range runs straight into another token (e.g. "$10-$206W")
+_COMPETITIVE_SCANNER = re.compile(
+    r"(?P<price>\d+[-–]\d+)\s*(?:百万|million)"  # Japanese/English price format like "10-12 百万"
+    r"|(?P<usd>\$\d+[-–]\$\d+)"  # Dollar format
+    r"|(?P<keyword>" + "|".join(re.escape(keyword) for keyword in _BRANDS + _SOURCES + _MARKET_TRIGGERS + ["競合"]) + r")"
+    r"|(?P<trigger>(?i:competitive|portfolio))"
+)
+# Category pairs keep their own pattern: the greedy "category（subcategory）" span would swallow other matches
+_CATEGORY_PAIR_PATTERN = re.compile(r"([^（]+)（([^）]+)）")
+
+
+def _scan_competitive_features(content: str) -> Dict[str, Any]:
+    """
+    Single pass over a document collecting competitive-analysis keywords, price ranges and section triggers
+    """
+    features = {"competitive": False, "market": False, "keywords": set(), "price_ranges": set()}
+
+    for match in _COMPETITIVE_SCANNER.finditer(content):
+        kind = match.lastgroup
+        if kind == "keyword":
+            keyword = match.group(kind)
+            if keyword == "競合":
+                features["competitive"] = True
+            elif keyword in _MARKET_TRIGGERS:
+                features["market"] = True
+            else:
+                features["keywords"].add(keyword)
+        elif kind == "trigger":
+            features["competitive"] = True
+        else:
+            features["price_ranges"].add(match.group(kind))
+
+    return features
+
+
+class CorpusState:
+    """
+    Immutable view of the loaded corpus
+
+    Reloads build a new state and swap it in with a single assignment, so a request that
+    grabbed the state once keeps a consistent set of documents and index shards
+    """
+
+    def __init__(
+        self,
+        documents: Dict[str, Dict[str, str]],
+        tables: Dict[str, Dict[str, List[DocxTable]]],
+        sentences: Dict[str, Dict[str, SentenceIndex]],
+        search_index: Dict[str, InvertedIndex],
+        passage_index: Optional[BM25Index],
+        dense_index: Optional[DenseIndex],
+        fingerprints: Dict[str, Tuple[int, int]],
+        version: int,
+    ):
+        self.documents = documents
+        self.tables = tables
+        self.sentences = sentences
+        self.search_index = search_index
+        self.passage_index = passage_index
+        self.dense_index = dense_index
+        self.fingerprints = fingerprints
+        self.version = version
+        self.regions = [region.replace("_dataset", "").title() for region in documents]
+        # Per-state result caches: swapping in a new state drops them, so they never need pruning or locking
+        self.competitive_cache: Dict[Optional[str], Dict[str, Any]] = {}
+        self.analysis_cache: Dict[Tuple[Optional[str], Optional[str]], Dict[str, str]] = {}
 
 
 class DocxProcessor:
@@ -12,23 +131,51 @@ class DocxProcessor:
 
     def __init__(self):
         self.data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-        self.processed_documents = {}
-        self.available_regions = []
+        self._state = CorpusState({}, {}, {}, {}, None, None, {}, 0)
         self.available_categories = []
         self.available_subcategories = []
+        self.ingest_workers = config.get("DOCX_INGEST_WORKERS", 0)
+        self.parse_timings: Dict[str, float] = {}
+        self.snapshot_enabled = config.get("DOCX_SNAPSHOT_CACHE", True)
+        self.snapshot: Optional[DocxSnapshotCache] = None
+        self.retrieval_mode = config.get("DOCX_RETRIEVAL_MODE", "bm25")
+        self.embedder = HashingEmbedder(config.get("DOCX_EMBEDDING_DIM", 512))
+        self._load_lock = threading.Lock()
+        self._reload_stop: Optional[threading.Event] = None
+
+    @property
+    def processed_documents(self) -> Dict[str, Dict[str, str]]:
+        return self._state.documents
+
+    @property
+    def search_index(self) -> Dict[str, InvertedIndex]:
+        return self._state.search_index
+
+    @property
+    def available_regions(self) -> List[str]:
+        return self._state.regions
+
+    @property
+    def corpus_version(self) -> int:
+        return self._state.version
 
-    def load_all_documents(self) -> Dict[str, Dict]:
+    @property
+    def corpus_hash(self) -> str:
+        """
+        Hash of the loaded files' sizes and mtimes, stable across restarts
+        """
+        return corpus_fingerprint(self._state.fingerprints)
+
+    def load_all_documents(self, workers: Optional[int] = None) -> Dict[str, Dict]:
         """
         Load all DOCX files from region-specific folders
+
+        Unchanged files are served from the on-disk snapshot; with more than one worker and enough
+        files to keep each busy, the remaining files are parsed concurrently in a process pool
         """
         try:
-            regions = ["india_dataset", "singapore_dataset", "vietnam_dataset"]
-
-            for region in regions:
-                region_path = os.path.join(self.data_dir, region)
-                if os.path.exists(region_path):
-                    self.processed_documents[region] = self._process_region_documents(region_path)
-                    self.available_regions.append(region.replace("_dataset", "").title())
+            with self._load_lock:
+                self._state = self._build_state(workers, previous=None)
 
             # Extract categories and subcategories from processed documents
             self._extract_categories()
@@ -40,40 +187,310 @@ class DocxProcessor:
             logger.write_error(f"Error loading DOCX documents: {str(e)}")
             raise Exception(f"Failed to load DOCX documents: {str(e)}") from e
 
-    def _process_region_documents(self, region_path: str) -> Dict[str, str]:
+    def reload_changed_documents(self, workers: Optional[int] = None) -> bool:
         """
-        Process all DOCX files in a region folder
+        Re-ingest only added, modified or removed DOCX files and swap in the new corpus state
+
+        Returns True when the corpus changed
         """
-        documents = {}
+        try:
+            with self._load_lock:
+                previous = self._state
+                state = self._build_state(workers, previous=previous)
+                if state is previous:
+                    return False
+                self._state = state
 
-        for filename in os.listdir(region_path):
-            if filename.endswith(".docx"):
-                file_path = os.path.join(region_path, filename)
+            logger.write_msg(f"DOCX corpus reloaded (version {state.version})")
+            return True
+
+        except Exception as e:
+            logger.write_error(f"Error reloading DOCX documents: {str(e)}")
+            raise Exception(f"Failed to reload DOCX documents: {str(e)}") from e
+
+    def start_auto_reload(self, interval: float):
+        """
+        Poll the data folders every `interval` seconds in a daemon thread and reload changed files
+        """
+        if self._reload_stop is not None:
+            return
+
+        stop = threading.Event()
+        self._reload_stop = stop
+
+        def poll():
+            while not stop.wait(interval):
                 try:
-                    content = self._extract_docx_content(file_path)
-                    documents[filename] = content
-                except Exception as e:
-                    logger.write_error(f"Error processing {filename}: {str(e)}")
+                    self.reload_changed_documents()
+                except Exception:
+                    # Already logged; keep serving the previous state and retry on the next tick
                     continue
 
-        return documents
+        threading.Thread(target=poll, name="docx-auto-reload", daemon=True).start()
+        logger.write_msg(f"DOCX auto-reload enabled (every {interval}s)")
 
-    def _extract_docx_content(self, file_path: str) -> str:
+    def stop_auto_reload(self):
         """
-        Extract text content from DOCX file
+        Stop the polling thread started by start_auto_reload
         """
+        if self._reload_stop is not None:
+            self._reload_stop.set()
+            self._reload_stop = None
+
+    def _build_state(self, workers: Optional[int], previous: Optional[CorpusState]) -> CorpusState:
+        """
+        Build a corpus state, reusing documents and index shards of regions untouched since `previous`
+
+        Returns `previous` itself when nothing on disk changed
+        """
+        regions = ["india_dataset", "singapore_dataset", "vietnam_dataset"]
+        workers = self.ingest_workers if workers is None else workers
+        started = time.perf_counter()
+
+        region_paths = {}
+        for region in regions:
+            region_path = os.path.join(self.data_dir, region)
+            if os.path.exists(region_path):
+                region_paths[region] = region_path
+
+        files = self._scan_document_files(region_paths)
+        fingerprints = {key: (stat.st_size, stat.st_mtime_ns) for key, (_, _, _, stat) in files.items()}
+
+        if previous is None:
+            changed = list(files)
+            affected_regions = set(region_paths)
+        else:
+            changed = [key for key in files if previous.fingerprints.get(key) != fingerprints[key]]
+            removed = [key for key in previous.fingerprints if key not in files]
+            affected_regions = {files[key][0] for key in changed} | {key.split("/", 1)[0] for key in removed}
+            affected_regions |= set(region_paths) ^ set(previous.documents)
+            if not affected_regions:
+                return previous
+
+        snapshot = self._open_snapshot()
+
+        parsed: Dict[str, Dict[str, str]] = {}
+        pending = []
+        for key in changed:
+            cached = snapshot.lookup(key, files[key][3]) if snapshot else None
+            if cached is None or "tables" not in cached:
+                pending.append(key)
+            else:
+                parsed[key] = cached
+
+        if len(pending) < workers * _POOL_MIN_FILES_PER_WORKER:
+            # Too few files to amortize spawning the pool (e.g. a hot reload of one file): parse inline
+            workers = 1
+        parsed.update(self._parse_documents(files, pending, workers))
+
+        documents: Dict[str, Dict[str, str]] = {}
+        tables: Dict[str, Dict[str, List[DocxTable]]] = {}
+        sentences: Dict[str, Dict[str, SentenceIndex]] = {}
+        search_index: Dict[str, InvertedIndex] = {}
+        for region in region_paths:
+            if region not in affected_regions:
+                documents[region] = previous.documents[region]
+                tables[region] = previous.tables[region]
+                sentences[region] = previous.sentences[region]
+                search_index[region] = previous.search_index[region]
+                continue
+
+            documents[region] = {}
+            tables[region] = {}
+            for key, (file_region, filename, _, _) in files.items():
+                if file_region != region:
+                    continue
+                if key in parsed:
+                    documents[region][filename] = parsed[key]["text"]
+                    tables[region][filename] = [DocxTable.from_dict(table) for table in json.loads(parsed[key]["tables"])]
+                elif previous is not None and filename in previous.documents.get(region, {}):
+                    documents[region][filename] = previous.documents[region][filename]
+                    tables[region][filename] = previous.tables[region][filename]
+
+            # Only shards of regions whose files changed are rebuilt (or loaded from disk when persisted)
+            search_index[region] = self._build_region_index(region, documents[region], fingerprints)
+            sentences[region] = {filename: SentenceIndex(content, _PILLAR_KEYWORD_LIST) for filename, content in documents[region].items()}
+
+        # Passage statistics (IDF, average length) are corpus-wide, so the BM25 index is rebuilt as a whole
+        passage_index = self._build_passage_index(documents, fingerprints)
+        dense_index = self._build_dense_index(documents, passage_index, fingerprints) if self.retrieval_mode == "dense" else None
+
+        if snapshot is not None and (pending or set(snapshot.keys()) != set(files)):
+            snapshot.save(
+                {
+                    key: (
+                        stat,
+                        {
+                            "text": documents[region][filename],
+                            "tables": json.dumps([table.to_dict() for table in tables[region][filename]], ensure_ascii=False),
+                        },
+                    )
+                    for key, (region, filename, _, stat) in files.items()
+                    if filename in documents[region]
+                }
+            )
+
+        logger.write_msg(
+            f"Loaded {len(changed)} of {len(files)} DOCX files in {time.perf_counter() - started:.3f}s "
+            f"({len(changed) - len(pending)} from snapshot, {len(pending)} parsed "
+            f"{'in a process pool of ' + str(workers) + ' workers' if workers > 1 else 'serially'})"
+        )
+
+        # Full loads continue the version sequence too, so nothing keyed on an older version can match the new corpus
+        return CorpusState(documents, tables, sentences, search_index, passage_index, dense_index, fingerprints, self._state.version + 1)
+
+    def _build_passage_index(self, documents: Dict[str, Dict[str, str]], fingerprints: Dict[str, Tuple[int, int]]) -> BM25Index:
+        """
+        Load the persisted BM25 index for this corpus, or build it (and persist it when the snapshot cache is on)
+        """
+        directory = os.path.join(self.data_dir, ".cache", "passage_index")
+        passage_size = config.get("DOCX_PASSAGE_SIZE", 400)
+        fingerprint = corpus_fingerprint(fingerprints, "bm25", passage_size)
+
+        index = BM25Index.load(directory, fingerprint) if self.snapshot_enabled else None
+        if index is not None:
+            return index
+
+        index = BM25Index.build(
+            {f"{region}/{filename}": content for region, docs in documents.items() for filename, content in docs.items()}, size=passage_size
+        )
+        if self.snapshot_enabled:
+            try:
+                index.save(directory, fingerprint)
+            except Exception as e:
+                logger.write_error(f"Error saving passage index: {str(e)}")
+        return index
+
+    def _build_dense_index(
+        self, documents: Dict[str, Dict[str, str]], passage_index: BM25Index, fingerprints: Dict[str, Tuple[int, int]]
+    ) -> DenseIndex:
+        """
+        Load the persisted dense index for this corpus, or embed the BM25 passages and persist a new one
+        """
+        started = time.perf_counter()
+        directory = os.path.join(self.data_dir, ".cache", "dense_index")
+        passages = passage_index.passages
+        nlist = config.get("DOCX_DENSE_NLIST", 0) or int(np.sqrt(len(passages)))
+        fingerprint = corpus_fingerprint(fingerprints, self.embedder.dim, config.get("DOCX_PASSAGE_SIZE", 400), nlist)
+
+        index = DenseIndex.load(directory, fingerprint)
+        if index is not None:
+            logger.write_msg(f"Dense index loaded from disk ({len(index.passages)} passages)")
+            return index
+
+        texts = []
+        for doc_path, start, end in passages:
+            region, filename = doc_path.split("/", 1)
+            texts.append(documents[region][filename][start:end])
+
+        index = DenseIndex.build(passages, self.embedder.embed(texts), nlist=nlist)
         try:
-            doc = Document(file_path)
-            content = []
+            index.save(directory, fingerprint)
+        except Exception as e:
+            logger.write_error(f"Error saving dense index: {str(e)}")
+
+        logger.write_msg(f"Dense index built: {len(passages)} passages, {nlist} IVF lists in {time.perf_counter() - started:.3f}s")
+        return index
+
+    def _scan_document_files(self, region_paths: Dict[str, str]) -> Dict[str, Tuple[str, str, str, os.stat_result]]:
+        """
+        Map snapshot key ("<region>/<file>") to (region, file name, file path, stat) for every DOCX file
+        """
+        files = {}
+        for region, region_path in region_paths.items():
+            for filename in self._list_docx_files(region_path):
+                file_path = os.path.join(region_path, filename)
+                files[f"{region}/{filename}"] = (region, filename, file_path, os.stat(file_path))
+        return files
+
+    def _open_snapshot(self) -> Optional[DocxSnapshotCache]:
+        """
+        Open the parsed-document snapshot, or return None when snapshot caching is disabled
+        """
+        if not self.snapshot_enabled:
+            return None
+        if self.snapshot is None:
+            self.snapshot = DocxSnapshotCache(os.path.join(self.data_dir, ".cache", "docx_snapshot.bin"))
+        self.snapshot.load()
+        return self.snapshot
+
+    def _parse_documents(self, files: Dict[str, Tuple[str, str, str, os.stat_result]], keys: List[str], workers: int) -> Dict[str, Dict[str, str]]:
+        """
+        Parse the given files into snapshot fields, serially or concurrently in a process pool
+        """
+        contents = {}
+        if not keys:
+            return contents
+
+        if workers <= 1:
+            for key in keys:
+                file_path = files[key][2]
+                started = time.perf_counter()
+                contents[key] = self._extract_docx_content(file_path)
+                self._record_parse_timing(key, time.perf_counter() - started)
+            return contents
+
+        # spawn rather than fork: by now the process runs the reload thread and executor threads, and a
+        # forked child could inherit one of their locks in a held state
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [(key, executor.submit(_parse_docx_file, files[key][2])) for key in keys]
+
+            for key, future in futures:
+                try:
+                    content, elapsed = future.result()
+                    contents[key] = content
+                    self._record_parse_timing(key, elapsed)
+                except Exception as e:
+                    # Same outcome as the serial path: the file is kept as an empty document
+                    logger.write_error(f"Error extracting content from {files[key][2]}: {str(e)}")
+                    contents[key] = dict(_EMPTY_FIELDS)
+
+        return contents
 
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    content.append(paragraph.text.strip())
+    def _list_docx_files(self, region_path: str) -> List[str]:
+        """
+        List DOCX file names in a region folder
+        """
+        return [filename for filename in os.listdir(region_path) if filename.endswith(".docx")]
+
+    def _record_parse_timing(self, key: str, elapsed: float):
+        """
+        Store and log the parse time of a single file
+        """
+        self.parse_timings[key] = elapsed
+        logger.write_msg(f"Parsed {key} in {elapsed * 1000:.1f}ms")
 
-            return "\n".join(content)
+    def _extract_docx_content(self, file_path: str) -> Dict[str, str]:
+        """
+        Extract text content and tables from DOCX file
+        """
+        try:
+            fields, _ = _parse_docx_file(file_path)
+            return fields
         except Exception as e:
             logger.write_error(f"Error extracting content from {file_path}: {str(e)}")
-            return ""
+            return dict(_EMPTY_FIELDS)
+
+    def _build_region_index(self, region: str, docs: Dict[str, str], fingerprints: Dict[str, Tuple[int, int]]) -> InvertedIndex:
+        """
+        Load the persisted inverted index shard of one region, or build it (and persist it when the snapshot cache is on)
+        """
+        directory = os.path.join(self.data_dir, ".cache", "search_index", region)
+        fingerprint = corpus_fingerprint({key: value for key, value in fingerprints.items() if key.split("/", 1)[0] == region}, "inverted")
+
+        index = InvertedIndex.load(directory, fingerprint, docs) if self.snapshot_enabled else None
+        if index is not None:
+            return index
+
+        index = InvertedIndex()
+        for doc_name, content in docs.items():
+            index.add_document(doc_name, content)
+        if self.snapshot_enabled:
+            try:
+                index.save(directory, fingerprint)
+            except Exception as e:
+                logger.write_error(f"Error saving search index for {region}: {str(e)}")
+        return index
 
     def _extract_categories(self):
         """
@@ -151,30 +568,77 @@ class DocxProcessor:
 
         results = {}
         query_lower = query.lower()
+        state = self._state
 
-        for region_name, docs in self.processed_documents.items():
+        for region_name, docs in state.documents.items():
             if region and region.lower() not in region_name.lower():
                 continue
 
-            for doc_name, content in docs.items():
-                if query_lower in content.lower():
-                    # Extract relevant context around the query
-                    context = self._extract_context(content, query_lower)
-                    results[f"{region_name}/{doc_name}"] = context
+            index = state.search_index.get(region_name)
+            if index is None:
+                continue
+
+            for doc_name, query_pos in index.search(query_lower):
+                # Extract relevant context around the query
+                context = self._extract_context(docs[doc_name], query_lower, query_pos=query_pos)
+                results[f"{region_name}/{doc_name}"] = context
 
-                    if len(results) >= limit:
-                        break
+                if len(results) >= limit:
+                    break
 
             if len(results) >= limit:
                 break
 
         return results
 
-    def _extract_context(self, content: str, query: str, context_length: int = 200) -> str:
+    def search_passages(self, query: str, region: Optional[str] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank document passages against a natural-language query
+
+        Uses the dense index when DOCX_RETRIEVAL_MODE is "dense", BM25 otherwise.
+        Returns up to top_k passages, best first, as dicts with document, text, start, end and score
+        """
+        if not self.processed_documents:
+            self.load_all_documents()
+
+        state = self._state
+        index = state.passage_index
+        if index is None:
+            return []
+
+        group = f"{region.lower()}_dataset" if region else None
+        if state.dense_index is not None:
+            allowed = None
+            if group is not None:
+                allowed = index.groups == index.group_ids.get(group, -1)
+            ranked = state.dense_index.search(
+                self.embedder.embed([query])[0], top_k, nprobe=config.get("DOCX_DENSE_NPROBE", 4), allowed=allowed
+            )
+        else:
+            ranked = index.search(query, top_k, group=group)
+
+        results = []
+        for passage_id, score in ranked:
+            doc_path, start, end = index.passages[passage_id]
+            region_name, doc_name = doc_path.split("/", 1)
+            results.append(
+                {
+                    "document": doc_path,
+                    "text": state.documents[region_name][doc_name][start:end],
+                    "start": start,
+                    "end": end,
+                    "score": round(score, 4),
+                }
+            )
+
+        return results
+
+    def _extract_context(self, content: str, query: str, context_length: int = 200, query_pos: Optional[int] = None) -> str:
         """
         Extract context around the query match
         """
-        query_pos = content.lower().find(query)
+        if query_pos is None:
+            query_pos = content.lower().find(query)
         if query_pos == -1:
             return content[:context_length] + "..."
 
@@ -193,6 +657,22 @@ class DocxProcessor:
         region_key = f"{region.lower()}_dataset"
         return self.processed_documents.get(region_key, {})
 
+    def get_region_tables(self, region: Optional[str] = None) -> Dict[str, List[DocxTable]]:
+        """
+        Get the structured tables of a region's documents (all regions when region is None)
+        """
+        if not self.processed_documents:
+            self.load_all_documents()
+
+        state = self._state
+        if region:
+            return state.tables.get(f"{region.lower()}_dataset", {})
+
+        tables = {}
+        for region_tables in state.tables.values():
+            tables.update(region_tables)
+        return tables
+
     def get_document_summary(self) -> Dict[str, Any]:
         """
         Get a summary of all available documents
@@ -200,8 +680,9 @@ class DocxProcessor:
         if not self.processed_documents:
             self.load_all_documents()
 
+        state = self._state
         summary = {}
-        for region, docs in self.processed_documents.items():
+        for region, docs in state.documents.items():
             summary[region] = {
                 "total_documents": len(docs),
                 "document_names": list(docs.keys()),
@@ -209,7 +690,7 @@ class DocxProcessor:
             }
 
         return {
-            "regions": self.available_regions,
+            "regions": state.regions,
             "categories": self.available_categories,
             "subcategories": self.available_subcategories,
             "document_summary": summary,
@@ -218,45 +699,49 @@ class DocxProcessor:
     def analyze_market_data(self, region: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze market data from documents based on region and category
+
+        Pillar extraction is a lookup into the pre-built sentence indexes; results are cached
+        per (region, category) on the corpus state they were built from
         """
         if not self.processed_documents:
             self.load_all_documents()
 
-        # Get relevant documents
-        if region:
-            docs = self.get_region_documents(region)
-        else:
-            docs = {}
-            for region_docs in self.processed_documents.values():
-                docs.update(region_docs)
+        state = self._state
+        region_key = f"{region.lower()}_dataset" if region else None
+        cache_key = (region_key, category)
 
-        # Extract structured data based on the required keys
-        analysis = {
-            "Population & Households": self._extract_key_data(docs, ["population", "household", "demographic", "family"]),
-            "Society & Economy": self._extract_key_data(docs, ["economy", "society", "social", "economic", "gdp", "income"]),
-            "Science & Technology": self._extract_key_data(docs, ["technology", "innovation", "digital", "smart", "iot", "ai"]),
-            "City & Nature": self._extract_key_data(docs, ["city", "urban", "nature", "environment", "sustainability", "green"]),
-        }
+        cached = state.analysis_cache.get(cache_key)
+        if cached is None:
+            # Get relevant documents
+            if region_key:
+                doc_sentences = state.sentences.get(region_key, {})
+            else:
+                doc_sentences = {}
+                for region_sentences in state.sentences.values():
+                    doc_sentences.update(region_sentences)
+
+            # Extract structured data based on the required keys
+            cached = {pillar: self._extract_key_data(doc_sentences, keywords) for pillar, keywords in _PILLAR_KEYWORDS.items()}
+
+            if region_key is None or region_key in state.documents:
+                state.analysis_cache[cache_key] = cached
 
-        return analysis
+        return dict(cached)
 
-    def _extract_key_data(self, docs: Dict[str, str], keywords: List[str]) -> str:
+    def _extract_key_data(self, doc_sentences: Dict[str, SentenceIndex], keywords: List[str]) -> str:
         """
         Extract data related to specific keywords from documents
         """
         relevant_content = []
 
-        for doc_name, content in docs.items():
+        for doc_name, sentence_index in doc_sentences.items():
             for keyword in keywords:
-                if keyword.lower() in content.lower():
-                    # Find sentences containing the keyword
-                    sentences = content.split(".")
-                    for sentence in sentences:
-                        if keyword.lower() in sentence.lower():
-                            relevant_content.append(sentence.strip())
-                            break
+                # First sentence containing the keyword
+                sentence = sentence_index.first_sentence(keyword)
+                if sentence:
+                    relevant_content.append(sentence)
 
-        return ". ".join(relevant_content[:3])  # Return top 3 relevant sentences
+        return " ".join(relevant_content[:3])  # Return top 3 relevant sentences
 
     def generate_chart_data(self, region: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -285,66 +770,74 @@ class DocxProcessor:
     def extract_competitive_analysis(self, region: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract competitive product portfolio and price architecture data from documents
+
+        Results are cached per region on the corpus state they were built from
         """
         if not self.processed_documents:
             self.load_all_documents()
 
+        state = self._state
+        region_key = f"{region.lower()}_dataset" if region else None
+
+        cached = state.competitive_cache.get(region_key)
+        if cached is None:
+            cached = self._build_competitive_analysis(state, region_key)
+            # Only known regions are cached so arbitrary query strings cannot grow the cache
+            if region_key is None or region_key in state.documents:
+                state.competitive_cache[region_key] = cached
+
+        return copy.deepcopy(cached)
+
+    def _build_competitive_analysis(self, state: CorpusState, region_key: Optional[str]) -> Dict[str, Any]:
+        """
+        Scan the selected documents once each and aggregate the competitive analysis
+        """
         # Get relevant documents
-        if region:
-            docs = self.get_region_documents(region)
+        if region_key:
+            docs = state.documents.get(region_key, {})
+            doc_tables = state.tables.get(region_key, {})
         else:
             docs = {}
-            for region_docs in self.processed_documents.values():
+            doc_tables = {}
+            for region_name, region_docs in state.documents.items():
                 docs.update(region_docs)
+                doc_tables.update(state.tables.get(region_name, {}))
 
         competitive_data = {
             "categories": {},
-            "price_ranges": {},
+            "price_ranges": set(),
             "brands": set(),
             "regions": set(),
             "market_data": {}
         }
 
         for doc_name, content in docs.items():
+            features = _scan_competitive_features(content)
+
             # Look for competitive analysis tables
-            if "競合" in content or "competitive" in content.lower() or "portfolio" in content.lower():
+            if features["competitive"]:
                 # Extract category and subcategory information
-                category_matches = re.findall(r"([^（]+)（([^）]+)）", content)
-                
-                for category, subcategory in category_matches:
+                for category, subcategory in _CATEGORY_PAIR_PATTERN.findall(content):
                     clean_category = category.strip()
                     clean_subcategory = subcategory.strip()
-                    
+
                     if clean_category not in competitive_data["categories"]:
                         competitive_data["categories"][clean_category] = []
-                    
+
                     if clean_subcategory not in competitive_data["categories"][clean_category]:
                         competitive_data["categories"][clean_category].append(clean_subcategory)
-                
-                # Extract brand information
-                brands = ["Samsung", "LG", "Panasonic", "Daikin", "Casper", "Hitachi", "Sharp", "Toshiba"]
-                for brand in brands:
-                    if brand in content:
-                        competitive_data["brands"].add(brand)
-                
-                # Extract price information
-                price_patterns = [
-                    r"(\d+[-–]\d+)\s*百万",  # Japanese price format like "10-12 百万"
-                    r"(\d+[-–]\d+)\s*million",  # English price format
-                    r"(\$\d+[-–]\$\d+)",  # Dollar format
-                ]
-                
-                for pattern in price_patterns:
-                    price_matches = re.findall(pattern, content)
-                    for price_match in price_matches:
-                        if "price_ranges" not in competitive_data:
-                            competitive_data["price_ranges"] = set()
-                        competitive_data["price_ranges"].add(price_match)
+
+                competitive_data["brands"].update(brand for brand in _BRANDS if brand in features["keywords"])
+                competitive_data["price_ranges"].update(features["price_ranges"])
 
             # Extract market data tables (like the CAGR table you showed)
-            if "CAGR" in content or "市場規模" in content or "TAM" in content:
-                market_data = self._extract_market_data_table(content)
+            if features["market"]:
+                market_data = self._extract_market_data_table([source for source in _SOURCES if source in features["keywords"]])
                 if market_data:
+                    # Numbers come straight from the parsed Word tables instead of regexes over flattened text
+                    market_data["tables"] = [
+                        table.to_json_summary() for table in doc_tables.get(doc_name, []) if table.matches(["CAGR", "市場規模", "TAM", "シェア"])
+                    ]
                     competitive_data["market_data"][doc_name] = market_data
 
         # Convert sets to lists for JSON serialization
@@ -353,48 +846,16 @@ class DocxProcessor:
 
         return competitive_data
 
-    def _extract_market_data_table(self, content: str) -> Dict[str, Any]:
+    def _extract_market_data_table(self, sources: List[str]) -> Optional[Dict[str, Any]]:
         """
-        Extract market data from tables like the CAGR table
+        Build the market data entry of a document from the data sources it cites
         """
         market_data = {
             "categories": {},
             "total_market": {},
-            "sources": set()
+            "sources": sources
         }
-        
-        # Look for market size patterns
-        market_size_patterns = [
-            r"(\d+\.?\d*)\s*[Bb]illion",  # Billion format
-            r"(\d+\.?\d*)\s*億",  # Japanese billion format
-            r"(\d+\.?\d*)\s*百万",  # Japanese million format
-        ]
-        
-        # Look for CAGR patterns
-        cagr_patterns = [
-            r"(\d+\.?\d*)\s*%",  # Percentage format
-            r"CAGR[:\s]*(\d+\.?\d*)",  # CAGR specific
-        ]
-        
-        # Look for category names
-        category_patterns = [
-            r"冷蔵", r"洗濯", r"RAC", r"ルーム", r"エアコン", r"小型キッチン",
-            r"refrigerator", r"washing", r"air conditioner", r"kitchen"
-        ]
-        
-        # Extract data sources
-        source_patterns = [
-            r"TechSci", r"IMARC", r"Markets&Data", r"GVR", r"Grand View",
-            r"6W", r"Credence", r"Euromonitor", r"Statista"
-        ]
-        
-        for source in source_patterns:
-            if source in content:
-                market_data["sources"].add(source)
-        
-        # Convert set to list
-        market_data["sources"] = list(market_data["sources"])
-        
+
         return market_data if market_data["sources"] else None
 
     def get_category_subcategory_mapping(self) -> Dict[str, List[str]]:
@@ -0,0 +1,119 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+from app.config import logger
+
+# File layout: magic, little-endian u32 header length, JSON header, then the concatenated UTF-8 field blobs
+_MAGIC = b"DOCXSNP1"
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+class DocxSnapshotCache:
+    """
+    Memory-mapped on-disk snapshot of parsed DOCX content, keyed by file path, size and mtime
+    """
+
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self._entries: Dict[str, Dict] = {}
+        self._blob_offset = 0
+        self._mmap: Optional[mmap.mmap] = None
+
+    def load(self) -> bool:
+        """
+        Map the snapshot file and read its header; returns False when there is no usable snapshot
+        """
+        self.close()
+        if not os.path.exists(self.snapshot_path):
+            return False
+
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if mapped[: len(_MAGIC)] != _MAGIC:
+                mapped.close()
+                logger.write_warning(f"Ignoring DOCX snapshot with unknown format: {self.snapshot_path}")
+                return False
+
+            header_start = len(_MAGIC) + _HEADER_LENGTH.size
+            (header_length,) = _HEADER_LENGTH.unpack_from(mapped, len(_MAGIC))
+            header = json.loads(mapped[header_start : header_start + header_length].decode("utf-8"))
+
+            self._mmap = mapped
+            self._entries = header["entries"]
+            self._blob_offset = header_start + header_length
+            return True
+        except Exception as e:
+            logger.write_error(f"Error loading DOCX snapshot {self.snapshot_path}: {str(e)}")
+            self.close()
+            return False
+
+    def close(self):
+        """
+        Release the memory map
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self._entries = {}
+
+    def lookup(self, key: str, stat: os.stat_result) -> Optional[Dict[str, str]]:
+        """
+        Return the cached fields for a file if its size and mtime still match the snapshot
+        """
+        entry = self._entries.get(key)
+        if entry is None or self._mmap is None:
+            return None
+
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return None
+
+        fields = {}
+        for name, (offset, length) in entry["fields"].items():
+            start = self._blob_offset + offset
+            fields[name] = self._mmap[start : start + length].decode("utf-8")
+        return fields
+
+    def keys(self):
+        """
+        Snapshot keys of all cached documents
+        """
+        return self._entries.keys()
+
+    def save(self, documents: Dict[str, Tuple[os.stat_result, Dict[str, str]]]):
+        """
+        Write a new snapshot atomically
+
+        Args:
+            documents: Mapping of snapshot key to (file stat taken before parsing, fields) for every document to keep
+        """
+        entries = {}
+        blobs = []
+        offset = 0
+
+        for key, (stat, fields) in documents.items():
+            field_spans = {}
+            for name, value in fields.items():
+                data = value.encode("utf-8")
+                field_spans[name] = [offset, len(data)]
+                blobs.append(data)
+                offset += len(data)
+            entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "fields": field_spans}
+
+        header = json.dumps({"version": 1, "entries": entries}, ensure_ascii=False).encode("utf-8")
+
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for data in blobs:
+                f.write(data)
+
+        # Other workers may be reading the old file; replacing the path leaves their mappings intact
+        os.replace(tmp_path, self.snapshot_path)
+        logger.write_msg(f"DOCX snapshot written: {len(entries)} documents, {offset} bytes")
@@ -0,0 +1,130 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Number at the start of a cell, after an optional sign, 約 and currency, e.g. "US$22.45bn（2024）" -> 22.45,
+# "▲5.8%" -> -5.8, "約1,400万台" -> 1400
+_NUMBER_PATTERN = re.compile(
+    r"\s*([-−▲△]?)\s*(?:約|およそ)?\s*(?:US\$|S\$|\$|¥|￥|€|₹|₫)?\s*([-−▲△+]?)(\d[\d,]*(?:\.\d+)?)\s*(%|％|bn|billion|million|百万|億|万)?",
+    re.IGNORECASE,
+)
+
+# Bracketed notes such as "（2024）" or "[S6]" after the number
+_NOTE_PATTERN = re.compile(r"[（(［\[][^）)］\]]*[）)］\]]")
+
+# Headers of citation and note columns, which stay text even when they hold footnote numbers like "16"
+_TEXT_HEADER_KEYWORDS = ("出所", "出典", "備考", "注記", "source", "note")
+
+# Longest text allowed after the number and its notes, e.g. a counter or unit word like "台" or "units"
+_MAX_SUFFIX_CHARS = 5
+
+
+def parse_number(cell: str) -> Optional[Tuple[float, str]]:
+    """
+    Parse the number a table cell starts with, returning (value, unit) or None
+
+    Cells with more than a short unit word after the number (e.g. "2025年以降に拡大") are text, not numbers
+    """
+    match = _NUMBER_PATTERN.match(cell)
+    if match is None:
+        return None
+
+    suffix = "".join(_NOTE_PATTERN.sub("", cell[match.end():]).split())
+    if len(suffix) > _MAX_SUFFIX_CHARS:
+        return None
+
+    sign, inner_sign, digits, unit = match.groups()
+    value = float(digits.replace(",", ""))
+    if (sign or inner_sign).strip("+"):
+        value = -value
+    return value, (unit or "").lower().replace("％", "%")
+
+
+class DocxTable:
+    """
+    A Word table stored column-wise: float64 arrays for numeric columns, object arrays for text columns
+    """
+
+    def __init__(self, header: List[str], rows: List[List[str]]):
+        self.header = header
+        self.rows = rows
+        self.columns: List[np.ndarray] = []
+        self.numeric: List[bool] = []
+        self.units: List[str] = []
+
+        for col in range(len(header)):
+            cells = [row[col] if col < len(row) else "" for row in rows]
+            parsed = [parse_number(cell) for cell in cells]
+            filled = [cell for cell in cells if cell.strip()]
+            numbers = [p for p in parsed if p is not None]
+
+            # A column is numeric when at least half of its non-empty cells are a number, unless it holds citations or notes
+            citations = any(keyword in header[col].lower() for keyword in _TEXT_HEADER_KEYWORDS)
+            if filled and not citations and len(numbers) * 2 >= len(filled):
+                self.columns.append(np.array([p[0] if p is not None else np.nan for p in parsed], dtype=np.float64))
+                self.numeric.append(True)
+                units = [p[1] for p in numbers if p[1]]
+                self.units.append(max(set(units), key=units.count) if units else "")
+            else:
+                self.columns.append(np.array(cells, dtype=object))
+                self.numeric.append(False)
+                self.units.append("")
+
+    def column(self, name: str) -> Optional[np.ndarray]:
+        """
+        Column array by header name
+        """
+        if name not in self.header:
+            return None
+        return self.columns[self.header.index(name)]
+
+    def numeric_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Mapping of header name to float64 array for every numeric column
+        """
+        return {name: column for name, column, numeric in zip(self.header, self.columns, self.numeric) if numeric}
+
+    def matches(self, keywords: List[str]) -> bool:
+        """
+        Whether any keyword appears in the header or the first (label) column
+        """
+        labels = self.header + (self.columns[0].tolist() if self.columns and not self.numeric[0] else [])
+        return any(keyword in label for keyword in keywords for label in labels)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-serializable form (raw cells; arrays are re-derived on load)
+        """
+        return {"header": self.header, "rows": self.rows}
+
+    def to_json_summary(self) -> Dict[str, Any]:
+        """
+        Header, labels and numeric columns for API responses (NaN becomes None)
+        """
+        return {
+            "header": self.header,
+            "labels": self.columns[0].tolist() if self.columns and not self.numeric[0] else [],
+            "numeric_columns": {
+                name: [None if np.isnan(value) else float(value) for value in column] for name, column in self.numeric_columns().items()
+            },
+            "units": {name: unit for name, unit, numeric in zip(self.header, self.units, self.numeric) if numeric and unit},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DocxTable":
+        return cls(data["header"], data["rows"])
+
+
+def extract_tables(doc) -> List[Dict[str, Any]]:
+    """
+    Extract every table of a python-docx Document as {"header", "rows"} cell text
+    """
+    tables = []
+
+    for table in doc.tables:
+        rows = [[cell.text.strip() for cell in row.cells] for row in table.rows]
+        if len(rows) < 2:
+            continue
+        tables.append({"header": rows[0], "rows": rows[1:]})
+
+    return tables
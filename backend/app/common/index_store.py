@@ -0,0 +1,79 @@
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import logger
+
+
+def save_arrays(directory: str, fingerprint: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+    """
+    Persist an index as .npy arrays plus a JSON manifest carrying the corpus fingerprint and metadata
+
+    Every build writes its arrays to new files, so a worker that has the previous build memory-mapped
+    keeps reading consistent data; the manifest switch to the new files is atomic
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    build = f"{fingerprint[:16]}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    files = {}
+    for name, array in arrays.items():
+        files[name] = f"{name}-{build}.npy"
+        tmp_path = os.path.join(directory, f"{files[name]}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(directory, files[name]))
+
+    manifest_path = os.path.join(directory, "manifest.json")
+    previous = _manifest_files(manifest_path)
+
+    manifest = {**metadata, "fingerprint": fingerprint, "arrays": list(arrays), "files": files}
+    tmp_path = os.path.join(directory, f"manifest.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    # The manifest is replaced last, so a reader never pairs it with arrays from an older build
+    os.replace(tmp_path, manifest_path)
+
+    # Unlinking leaves the previous build readable for workers that still have it mapped
+    for file_name in previous:
+        if file_name not in files.values():
+            try:
+                os.remove(os.path.join(directory, file_name))
+            except OSError:
+                pass
+
+
+def load_arrays(directory: str, fingerprint: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """
+    Memory-map the arrays of a persisted index and return them with its manifest
+
+    Returns None when the index is missing or was built from a different corpus
+    """
+    manifest_path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["fingerprint"] != fingerprint:
+            return None
+
+        files = manifest.get("files", {name: f"{name}.npy" for name in manifest["arrays"]})
+        arrays = {name: np.load(os.path.join(directory, files[name]), mmap_mode="r") for name in manifest["arrays"]}
+        return arrays, manifest
+    except Exception as e:
+        logger.write_error(f"Error loading index {directory}: {str(e)}")
+        return None
+
+
+def _manifest_files(manifest_path: str) -> List[str]:
+    """
+    Array files referenced by an existing manifest
+    """
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return list(manifest.get("files", {name: f"{name}.npy" for name in manifest["arrays"]}).values())
+    except (OSError, ValueError, KeyError):
+        return []
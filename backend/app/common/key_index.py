@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+
+class SortedKeyIndex:
+    """
+    Sorted composite-key index over categorical key columns followed by one integer range column
+
+    Each row's key packs the category codes and the range value into one int64 in column order, so
+    every prefix of the key columns (and a range on the last column once all of them are fixed)
+    maps to one contiguous run of the sorted keys, found with one vectorized binary search.
+    """
+
+    def __init__(self, data: pd.DataFrame, key_columns: Sequence[str], range_column: str):
+        self.key_columns = tuple(key_columns)
+        self.range_column = range_column
+        # Category -> code per key column, and the raw code arrays for filters the sort order cannot answer
+        self._code_maps = [{value: code for code, value in enumerate(data[column].cat.categories)} for column in self.key_columns]
+        self._codes = [data[column].cat.codes.to_numpy() for column in self.key_columns]
+
+        range_values = data[range_column].to_numpy().astype(np.int64)
+        self._range_min = int(range_values.min()) if len(range_values) else 0
+        range_radix = int(range_values.max()) - self._range_min + 1 if len(range_values) else 1
+
+        # Codes are shifted by one so a missing value (code -1) sorts first as 0
+        radices = [len(code_map) + 1 for code_map in self._code_maps]
+        keys = np.zeros(len(data), dtype=np.int64)
+        for codes, radix in zip(self._codes, radices):
+            keys = keys * radix + (codes.astype(np.int64) + 1)
+        keys = keys * range_radix + (range_values - self._range_min)
+
+        # _spans[i] is the key width covered by fixing the first i key columns
+        self._spans = [int(np.prod(radices[i:], dtype=np.int64)) * range_radix for i in range(len(radices) + 1)]
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+        self._range_values = range_values[self._order]
+        self._all_range_values = range_values
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, equals: Dict[str, Optional[str]], low: Optional[int] = None, high: Optional[int] = None) -> np.ndarray:
+        """
+        Ascending row positions whose key columns equal the given values and whose range column is within [low, high]
+
+        The longest leading run of given key columns is answered from the sort order; a key column given
+        after a gap (e.g. the third without the second) is checked on the rows of that run only.
+        Without a leading key column the rows are found with a plain scan of the code arrays.
+        """
+        for column, value in equals.items():
+            if value and column not in self.key_columns:
+                raise ValueError(f"{column} is not a key column of this index")
+
+        codes = []
+        for position, column in enumerate(self.key_columns):
+            value = equals.get(column)
+            if not value:
+                codes.append(None)
+                continue
+            code = self._code_maps[position].get(value)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            codes.append(code)
+
+        prefix_length = 0
+        while prefix_length < len(codes) and codes[prefix_length] is not None:
+            prefix_length += 1
+
+        if prefix_length == 0:
+            return self._scan(codes, low, high)
+
+        rows = self._prefix_rows(codes[:prefix_length], low, high)
+        for position in range(prefix_length, len(codes)):
+            if codes[position] is not None and len(rows):
+                rows = rows[self._codes[position][rows] == codes[position]]
+        return rows
+
+    def _prefix_rows(self, codes: List[int], low: Optional[int], high: Optional[int]) -> np.ndarray:
+        prefix = 0
+        for position, code in enumerate(codes):
+            prefix = prefix * (len(self._code_maps[position]) + 1) + code + 1
+
+        if len(codes) == len(self.key_columns):
+            # Fully specified key: the range is a contiguous run as well
+            range_radix = self._spans[-1]
+            low_offset = 0 if low is None else max(low - self._range_min, 0)
+            high_offset = range_radix - 1 if high is None else min(high - self._range_min, range_radix - 1)
+            if low_offset > high_offset:
+                return np.empty(0, dtype=np.int64)
+            start, stop = np.searchsorted(self._keys, [prefix * range_radix + low_offset, prefix * range_radix + high_offset + 1])
+            return np.sort(self._order[start:stop])
+
+        span = self._spans[len(codes)]
+        start, stop = np.searchsorted(self._keys, [prefix * span, (prefix + 1) * span])
+        if low is None and high is None:
+            return np.sort(self._order[start:stop])
+
+        # Partial prefix: the range column is checked within the prefix's run
+        in_range = np.ones(stop - start, dtype=bool)
+        if low is not None:
+            in_range &= self._range_values[start:stop] >= low
+        if high is not None:
+            in_range &= self._range_values[start:stop] <= high
+        return np.sort(self._order[start:stop][in_range])
+
+    def _scan(self, codes: List[Optional[int]], low: Optional[int], high: Optional[int]) -> np.ndarray:
+        mask = np.ones(len(self._keys), dtype=bool)
+        for position, code in enumerate(codes):
+            if code is not None:
+                mask &= self._codes[position] == code
+        if low is not None:
+            mask &= self._all_range_values >= low
+        if high is not None:
+            mask &= self._all_range_values <= high
+        return np.flatnonzero(mask)
@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Measure name -> dataset column summed into the cube
+CUBE_MEASURES = {"market_value": "market_value_usd_billions", "units": "market_size_units_millions"}
+
+
+class MarketCube:
+    """
+    Dense year x standard region x category aggregate of the market trend dataset
+
+    Holds one float64 array per summed measure plus a row count, shaped (years, standard regions + "Other",
+    categories + missing). ASP is derived from the value and unit sums of a slice, since it does not add up.
+    """
+
+    def __init__(self, first_year: int, regions: Sequence[str], categories: pd.Index, measures: Dict[str, np.ndarray], rows: np.ndarray):
+        self.first_year = first_year
+        self.regions = list(regions)
+        self._category_codes = {category: code for code, category in enumerate(categories)}
+        self._measures = measures
+        self._rows = rows
+
+    @classmethod
+    def build(cls, data: pd.DataFrame, region_mapping: Dict[str, str], standard_regions: Sequence[str]) -> "MarketCube":
+        """
+        Aggregate a market trend frame; regions missing from region_mapping are summed into "Other"
+        """
+        regions = [*standard_regions, "Other"]
+        region_categories = data["region"].cat.categories
+        categories = data["category"].cat.categories
+
+        # Standard region slot per region code; the trailing entry catches missing regions (code -1)
+        region_slots = np.array([regions.index(region_mapping.get(region, "Other")) for region in region_categories] + [len(regions) - 1])
+
+        years = data["year"].to_numpy().astype(np.int64)
+        first_year = int(years.min()) if len(years) else 0
+        shape = (int(years.max()) - first_year + 1 if len(years) else 0, len(regions), len(categories) + 1)
+
+        # Missing categories (code -1) land in the last category slot
+        category_codes = data["category"].cat.codes.to_numpy().astype(np.int64)
+        category_codes[category_codes < 0] = len(categories)
+        cells = np.ravel_multi_index((years - first_year, region_slots[data["region"].cat.codes.to_numpy()], category_codes), shape)
+
+        size = int(np.prod(shape))
+        measures = {
+            name: np.bincount(cells, weights=np.nan_to_num(data[column].to_numpy(dtype=np.float64)), minlength=size).reshape(shape)
+            for name, column in CUBE_MEASURES.items()
+        }
+        rows = np.bincount(cells, minlength=size).reshape(shape)
+        return cls(first_year, regions, categories, measures, rows)
+
+    def slice(self, measure: str, category: Optional[str] = None, years: Optional[Iterable[int]] = None) -> Tuple[List[int], np.ndarray]:
+        """
+        Years that have data, and the (years, regions) matrix of a measure for one category or all of them
+
+        measure is a key of CUBE_MEASURES or "asp" (USD per unit); years restricts the result to the given years
+        """
+        if category:
+            code = self._category_codes.get(category)
+            if code is None:
+                return [], np.zeros((0, len(self.regions)))
+            category_slice = slice(code, code + 1)
+        else:
+            category_slice = slice(None)
+
+        year_positions = np.arange(self._rows.shape[0])
+        if years is not None:
+            wanted = np.array(sorted(set(years)), dtype=np.int64) - self.first_year
+            year_positions = wanted[(wanted >= 0) & (wanted < self._rows.shape[0])]
+
+        # Only years with at least one row in the slice appear, as after a groupby
+        row_counts = self._rows[year_positions][:, :, category_slice].sum(axis=(1, 2))
+        year_positions = year_positions[row_counts > 0]
+
+        if measure == "asp":
+            value = self._sum("market_value", year_positions, category_slice)
+            units = self._sum("units", year_positions, category_slice)
+            # US$ billions / million units -> US$ per unit
+            matrix = np.divide(value * 1000, units, out=np.zeros_like(value), where=units > 0)
+        else:
+            matrix = self._sum(measure, year_positions, category_slice)
+
+        return (year_positions + self.first_year).tolist(), matrix
+
+    def _sum(self, measure: str, year_positions: np.ndarray, category_slice: slice) -> np.ndarray:
+        return self._measures[measure][year_positions][:, :, category_slice].sum(axis=2)
@@ -0,0 +1,327 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    """
+    Compact JSON encoding of a record; datetimes become ISO strings
+    """
+
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if hasattr(value, "model_dump"):
+            return value.model_dump(exclude_none=True)
+        return str(value)
+
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=default)
+
+
+def _estimate_bytes(record: Dict[str, Any]) -> int:
+    """
+    Approximate memory footprint of a record: the size of its JSON encoding
+    """
+    return len(_encode(record).encode("utf-8"))
+
+
+class MessageStore(ABC):
+    """
+    Storage backend for chat messages, keyed by message id
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the record stored under key, or None when it is missing or expired
+        """
+
+    @abstractmethod
+    def put(self, key: str, record: Dict[str, Any]):
+        """
+        Store a record under key, replacing any previous one
+        """
+
+    @abstractmethod
+    def update(self, key: str, **fields) -> bool:
+        """
+        Merge fields into an existing record; returns False when the key is missing or expired
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """
+        Size and hit/miss/eviction counters
+        """
+
+
+class InMemoryMessageStore(MessageStore):
+    """
+    Bounded in-memory store for chat messages with LRU eviction and sliding TTL expiry
+
+    Every read or write moves an entry to the back and pushes its expiry out, so the front of the
+    order is always the next entry to expire or be evicted
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            record, size, _ = entry
+            self._entries[key] = (record, size, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            return record
+
+    def put(self, key: str, record: Dict[str, Any]):
+        # Least recently used entries beyond the entry and byte limits are evicted
+        size = _estimate_bytes(record)
+        with self._lock:
+            self._store(key, record, size)
+
+    def update(self, key: str, **fields) -> bool:
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            record = {**entry[0], **fields}
+            self._store(key, record, _estimate_bytes(record))
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, record: Dict[str, Any], size: int):
+        self._remove(key)
+        self._entries[key] = (record, size, time.monotonic() + self.ttl_seconds)
+        self._bytes += size
+        self._expire()
+        self._evict()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._entries:
+            key, (_, _, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            self._expirations += 1
+
+    def _evict(self):
+        # The newest entry is always kept, even if it alone exceeds max_bytes
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+
+class SQLiteMessageStore(MessageStore):
+    """
+    Message store in a SQLite file shared by every worker process on the host
+
+    Records are kept as compact JSON. Limits and the sliding TTL behave like InMemoryMessageStore,
+    except that timestamps round-trip as ISO strings. Hit/miss counters are per process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages "
+                "(id TEXT PRIMARY KEY, record TEXT NOT NULL, size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS messages_accessed_at ON messages (accessed_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS messages_expires_at ON messages (expires_at)")
+            # Running entry and byte totals, kept by triggers so a write never has to scan the table for them
+            connection.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO totals SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM messages")
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS messages_insert AFTER INSERT ON messages "
+                "BEGIN UPDATE totals SET entries = entries + 1, bytes = bytes + new.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS messages_delete AFTER DELETE ON messages "
+                "BEGIN UPDATE totals SET entries = entries - 1, bytes = bytes - old.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS messages_update AFTER UPDATE OF size ON messages "
+                "BEGIN UPDATE totals SET bytes = bytes + new.size - old.size; END"
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers in other workers proceed while one writes
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        connection = self._connect()
+        row = connection.execute(
+            "UPDATE messages SET expires_at = ?, accessed_at = ? WHERE id = ? AND expires_at > ? RETURNING record",
+            (now + self.ttl_seconds, now, key, now),
+        ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, record: Dict[str, Any]):
+        self._write(key, _encode(record))
+
+    def update(self, key: str, **fields) -> bool:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT record FROM messages WHERE id = ? AND expires_at > ?", (key, time.time())).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return False
+            self._write(key, _encode({**json.loads(row[0]), **fields}), in_transaction=True)
+            connection.execute("COMMIT")
+            return True
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _write(self, key: str, encoded: str, in_transaction: bool = False):
+        now = time.time()
+        connection = self._connect()
+        if not in_transaction:
+            connection.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete would bypass the totals triggers
+            connection.execute(
+                "INSERT INTO messages (id, record, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET record = excluded.record, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (key, encoded, len(encoded.encode("utf-8")), now + self.ttl_seconds, now),
+            )
+            expired = connection.execute("DELETE FROM messages WHERE expires_at <= ?", (now,)).rowcount
+            evicted = self._evict(connection, key)
+            if not in_transaction:
+                connection.execute("COMMIT")
+        except Exception:
+            if not in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._expirations += expired
+            self._evictions += evicted
+
+    def _evict(self, connection: sqlite3.Connection, key: str) -> int:
+        """
+        Delete least recently used entries until both limits hold; the entry just written always survives
+        """
+        entries, total_bytes = connection.execute("SELECT entries, bytes FROM totals").fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return 0
+
+        # Walks the accessed_at index from the oldest entry and stops as soon as enough have been picked
+        victims = []
+        cursor = connection.execute("SELECT id, size FROM messages WHERE id != ? ORDER BY accessed_at", (key,))
+        for victim, size in cursor:
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            victims.append((victim,))
+            entries -= 1
+            total_bytes -= size
+        cursor.close()
+
+        connection.executemany("DELETE FROM messages WHERE id = ?", victims)
+        return len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        entries, total_bytes = self._connect().execute("SELECT entries, bytes FROM totals").fetchone()
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "entries": entries,
+                "bytes": total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+def create_message_store(
+    backend: str = "memory", path: str = "", max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600
+) -> MessageStore:
+    """
+    Build the configured message store backend ("memory" or "sqlite")
+    """
+    if backend == "sqlite":
+        path = path or os.path.join(os.path.dirname(__file__), "..", "data", ".cache", "messages.sqlite3")
+        return SQLiteMessageStore(path, max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+    if backend == "memory":
+        return InMemoryMessageStore(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown message store backend: {backend}")
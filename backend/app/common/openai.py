@@ -1,50 +1,116 @@
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
 from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception_type
-from typing import List, Dict, Optional, AsyncGenerator
+from typing import List, Dict, Optional, AsyncGenerator, Tuple
 import asyncio
-import re
+import os
 
-from app.config import config
+from app.config import config, logger
+from app.common.answer_cache import AnswerCache, answer_cache_key
+from app.common.chart_stream_parser import ChartBlockParser
+from app.common.context_packer import estimate_tokens, format_passage, pack_passages
 from app.common.prompts import SYSTEM_PROMPT
 from app.common.docx_processor import DocxProcessor
+from app.common.message_store import create_message_store
 
 
 class OpenAIHandler:
     def __init__(self) -> None:
         self._openai_client = OpenAI(api_key=config["OPENAI_API_KEY"], organization=config["OPENAI_API_ORG"])
+        # Streaming goes through the async client so a generation never blocks the event loop;
+        # all streams share one pooled HTTP client and at most OPENAI_MAX_CONCURRENT_STREAMS run at once
+        max_connections = config.get("OPENAI_MAX_CONNECTIONS", 100)
+        self._async_http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self._async_openai_client = AsyncOpenAI(
+            api_key=config["OPENAI_API_KEY"], organization=config["OPENAI_API_ORG"], http_client=self._async_http_client
+        )
+        self._stream_semaphore = asyncio.Semaphore(config.get("OPENAI_MAX_CONCURRENT_STREAMS", 50))
         self.docx_processor = DocxProcessor()
         self.docx_processor.load_all_documents()
+        if config["DOCX_RELOAD_INTERVAL"] > 0:
+            self.docx_processor.start_auto_reload(config["DOCX_RELOAD_INTERVAL"])
+
+        self.answer_cache: Optional[AnswerCache] = None
+        if config.get("ANSWER_CACHE_ENABLED", True):
+            self.answer_cache = AnswerCache(
+                create_message_store(
+                    backend=config.get("ANSWER_CACHE_BACKEND", "memory"),
+                    path=config.get("ANSWER_CACHE_PATH", "") or os.path.join(self.docx_processor.data_dir, ".cache", "answers.sqlite3"),
+                    max_entries=config.get("ANSWER_CACHE_MAX_ENTRIES", 1000),
+                    max_bytes=config.get("ANSWER_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+                    ttl_seconds=config.get("ANSWER_CACHE_TTL_SECONDS", 86400),
+                )
+            )
 
     def _prepare_data_context(self, user_message: str) -> str:
         """
         Prepare relevant data context based on user message from DOCX documents
+
+        Ranked passages are packed into CONTEXT_TOKEN_BUDGET first; the region/category listing is
+        only added when budget is left over
         """
         try:
+            budget = config.get("CONTEXT_TOKEN_BUDGET", 1500)
+
+            if config.get("DOCX_RETRIEVAL_MODE", "bm25") != "keyword":
+                # Ranked passages (BM25 or dense): natural-language messages rarely contain an exact document substring
+                passages = self.docx_processor.search_passages(user_message, top_k=8)
+            else:
+                # Search for relevant data based on user message
+                search_results = self.docx_processor.search_documents(user_message, limit=3)
+                passages = [
+                    {"document": doc_path, "text": content, "start": 0, "end": len(content)} for doc_path, content in search_results.items() if content
+                ]
+
+            header = "## Relevant Document Content Found:\n"
+            packed, used = pack_passages(passages, budget - estimate_tokens(header))
+            context = ""
+            if packed:
+                # The header is only worth its tokens when at least one passage follows it
+                context = header + "".join(format_passage(passage) for passage in packed)
+                used += estimate_tokens(header)
+
             # Get available options for suggestions
             regions = self.docx_processor.get_available_regions()
             categories = self.docx_processor.get_available_categories()
+            options = (
+                "## Available Data Options:\n"
+                f"**Regions**: {', '.join(regions[:10])}{'...' if len(regions) > 10 else ''}\n"
+                f"**Product Categories**: {', '.join(categories[:10])}{'...' if len(categories) > 10 else ''}\n\n"
+            )
+            if used + estimate_tokens(options) <= budget:
+                context = options + context
+                used += estimate_tokens(options)
 
-            # Search for relevant data based on user message
-            search_results = self.docx_processor.search_documents(user_message, limit=3)
+            logger.write_msg(f"Data context packed: {len(packed)} passages, ~{used}/{budget} tokens")
+            return context
 
-            context = f"""
-            ## Available Data Options:
-            **Regions**: {', '.join(regions[:10])}{'...' if len(regions) > 10 else ''}
-            **Product Categories**: {', '.join(categories[:10])}{'...' if len(categories) > 10 else ''}
+        except Exception as e:
+            return f"Document context preparation error: {str(e)}"
+
+    def _prepare_messages(
+        self, messages: List[Dict[str, str]], model: str, max_tokens: int, temperature: float
+    ) -> Tuple[List[Dict[str, str]], str]:
+        """
+        Build the full message list (system prompt with data context first) and its answer cache key
 
-            ## Relevant Document Content Found:
-            """
+        The key covers the generation parameters, so streamed and non-streamed answers of different lengths do not mix
+        """
+        # Prepare system message with data context
+        system_message = SYSTEM_PROMPT
 
-            for doc_path, content in search_results.items():
-                if content:
-                    context += f"\n**{doc_path}**:\n"
-                    # Show first 200 characters of relevant content
-                    context += content[:200] + "...\n"
+        # Add data context if this is a user message
+        if messages and messages[-1].get("role") == "user":
+            data_context = self._prepare_data_context(messages[-1]["content"])
+            system_message += f"\n\n## Current Data Context:\n{data_context}"
 
-            return context
+        # Prepare messages with system prompt
+        full_messages = [{"role": "system", "content": system_message}]
+        full_messages.extend(messages)
 
-        except Exception as e:
-            return f"Document context preparation error: {str(e)}"
+        return full_messages, answer_cache_key(model, messages, system_message, max_tokens, temperature)
 
     @retry(wait=wait_random_exponential(min=1, max=5), stop=stop_after_attempt(5), retry=retry_if_exception_type(Exception))
     def chat_completion(self, messages: List[Dict[str, str]], model: str = "gpt-5-chat-latest") -> str:
@@ -59,22 +125,20 @@ class OpenAIHandler:
             Generated response content
         """
         try:
-            # Prepare system message with data context
-            system_message = SYSTEM_PROMPT
-
-            # Add data context if this is a user message
-            if messages and messages[-1].get("role") == "user":
-                data_context = self._prepare_data_context(messages[-1]["content"])
-                system_message += f"\n\n## Current Data Context:\n{data_context}"
+            max_tokens, temperature = 8000, 0.3
+            full_messages, cache_key = self._prepare_messages(messages, model, max_tokens, temperature)
 
-            # Prepare messages with system prompt
-            full_messages = [{"role": "system", "content": system_message}]
-            full_messages.extend(messages)
+            cached = self.answer_cache.get(cache_key) if self.answer_cache else None
+            if cached is not None:
+                return cached
 
             response = self._openai_client.chat.completions.create(
-                model=model, messages=full_messages, max_tokens=8000, temperature=0.3, stream=False
+                model=model, messages=full_messages, max_tokens=max_tokens, temperature=temperature, stream=False
             )
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            if self.answer_cache:
+                self.answer_cache.put(cache_key, answer)
+            return answer
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}") from e
 
@@ -90,64 +154,46 @@ class OpenAIHandler:
             Dictionary with 'type' and 'data' keys for different content types
         """
         try:
-            # Prepare system message with data context
-            system_message = SYSTEM_PROMPT
-
-            # Add data context if this is a user message
-            if messages and messages[-1].get("role") == "user":
-                data_context = self._prepare_data_context(messages[-1]["content"])
-                system_message += f"\n\n## Current Data Context:\n{data_context}"
-
-            # Prepare messages with system prompt
-            full_messages = [{"role": "system", "content": system_message}]
-            full_messages.extend(messages)
+            max_tokens, temperature = 12000, 0.3
+            full_messages, cache_key = self._prepare_messages(messages, model, max_tokens, temperature)
+
+            # The cache may be a SQLite file, so its reads and writes stay off the event loop
+            cached = await asyncio.to_thread(self.answer_cache.get, cache_key) if self.answer_cache else None
+            if cached is not None:
+                # Replay the cached answer through the same chart parsing as a live stream
+                yield {"type": "status", "data": "Loaded cached analysis"}
+                chart_parser = ChartBlockParser()
+                for start in range(0, len(cached), 512):
+                    for event in chart_parser.feed(cached[start : start + 512]):
+                        yield event
+                for event in chart_parser.close():
+                    yield event
+                yield {"type": "status", "data": "Analysis completed"}
+                return
 
             # Send initial status
             yield {"type": "status", "data": "Connecting to AI..."}
-            await asyncio.sleep(0.1)
-
-            # Create streaming response with increased token limit
-            stream = self._openai_client.chat.completions.create(model=model, messages=full_messages, max_tokens=12000, temperature=0.3, stream=True)
-
-            accumulated_content = ""
-            chart_config_buffer = ""
-            in_chart_config = False
-
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    accumulated_content += content
-
-                    # Check for chart configuration start
-                    if "```json" in content and "chartConfig" in content:
-                        in_chart_config = True
-                        chart_config_buffer = content
-                        continue
-                    elif in_chart_config:
-                        chart_config_buffer += content
-
-                        # Check for chart configuration end
-                        if "```" in content and chart_config_buffer.count("```") >= 2:
-                            in_chart_config = False
-                            # Try to extract chart config with improved regex
-                            try:
-                                # More flexible regex to handle incomplete JSON
-                                chart_match = re.search(r'```json\s*(\{[\s\S]*?"chartConfig"[\s\S]*?)\s*```', chart_config_buffer)
-                                if chart_match:
-                                    chart_config = chart_match.group(1)
-                                    # Validate JSON structure
-                                    if chart_config.count('{') >= chart_config.count('}') and '"chartConfig"' in chart_config:
-                                        yield {"type": "chart", "data": chart_config}
-                                    chart_config_buffer = ""
-                                    continue
-                            except Exception as e:
-                                pass
-                            chart_config_buffer = ""
-                        continue
-
-                    # Send content chunk
-                    yield {"type": "content", "data": content}
-                    await asyncio.sleep(0.01)  # Small delay for smooth streaming
+
+            # Create streaming response with increased token limit; leaving the block (also on client
+            # disconnect) releases both the stream slot and the pooled connection
+            async with self._stream_semaphore, await self._async_openai_client.chat.completions.create(
+                model=model, messages=full_messages, max_tokens=max_tokens, temperature=temperature, stream=True
+            ) as stream:
+                # Chart blocks are cut out of the text incrementally, even when a fence spans several deltas
+                chart_parser = ChartBlockParser()
+                answer_parts = []
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        answer_parts.append(chunk.choices[0].delta.content)
+                        for event in chart_parser.feed(chunk.choices[0].delta.content):
+                            yield event
+
+            for event in chart_parser.close():
+                yield event
+
+            # Only answers streamed to the end are cached
+            if self.answer_cache:
+                await asyncio.to_thread(self.answer_cache.put, cache_key, "".join(answer_parts))
 
             # Send completion status
             yield {"type": "status", "data": "Analysis completed"}
@@ -155,6 +201,12 @@ class OpenAIHandler:
         except Exception as e:
             yield {"type": "error", "data": f"OpenAI API error: {str(e)}"}
 
+    async def aclose(self):
+        """
+        Close the pooled HTTP connections of the async OpenAI client
+        """
+        await self._async_openai_client.close()
+
     def get_data_summary(self) -> Dict:
         """
         Get a summary of available documents for the AI to reference
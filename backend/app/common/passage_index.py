@@ -0,0 +1,165 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.common.index_store import load_arrays, save_arrays
+from app.common.search_index import tokenize
+
+
+def chunk_text(text: str, size: int = 400, overlap: int = 80) -> List[Tuple[int, int]]:
+    """
+    Split text into overlapping (start, end) passage spans, ending at a line break or "。" where possible
+    """
+    spans = []
+    start = 0
+    length = len(text)
+
+    while start < length:
+        end = min(length, start + size)
+        if end < length:
+            cut = max(text.rfind("\n", start + size // 2, end), text.rfind("。", start + size // 2, end))
+            if cut != -1:
+                end = cut + 1
+
+        if text[start:end].strip():
+            spans.append((start, end))
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+
+    return spans
+
+
+class BM25Index:
+    """
+    BM25 index over document passages
+
+    Postings are stored term-major (CSR layout) with the BM25 weight of every (term, passage) pair
+    precomputed, so scoring a query is one weighted bincount over the postings of its terms
+    """
+
+    def __init__(
+        self,
+        passages: List[Tuple[str, int, int]],
+        group_ids: Dict[str, int],
+        vocabulary: Dict[str, int],
+        groups: np.ndarray,
+        postings: np.ndarray,
+        offsets: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.passages = passages
+        self.group_ids = group_ids
+        self.vocabulary = vocabulary
+        self.groups = groups
+        self.postings = postings
+        self.offsets = offsets
+        self.weights = weights
+
+    @classmethod
+    def build(cls, documents: Dict[str, str], size: int = 400, overlap: int = 80, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """
+        Chunk the documents into passages and index them
+
+        Args:
+            documents: Mapping of document key ("<region>/<file>") to text
+        """
+        passages: List[Tuple[str, int, int]] = []
+        group_ids: Dict[str, int] = {}
+        vocabulary: Dict[str, int] = {}
+
+        term_ids = []
+        passage_ids = []
+        frequencies = []
+        lengths = []
+        groups = []
+
+        for key, text in documents.items():
+            group = group_ids.setdefault(key.split("/", 1)[0], len(group_ids))
+            lowered = text.lower()
+            for start, end in chunk_text(text, size, overlap):
+                counts = Counter(token for token, _ in tokenize(lowered[start:end]))
+                if not counts:
+                    continue
+
+                passage_id = len(passages)
+                passages.append((key, start, end))
+                lengths.append(sum(counts.values()))
+                groups.append(group)
+                for token, count in counts.items():
+                    term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                    passage_ids.append(passage_id)
+                    frequencies.append(count)
+
+        term_ids = np.array(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+
+        postings = np.array(passage_ids, dtype=np.int32)[order]
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+
+        tf = np.array(frequencies, dtype=np.float32)[order]
+        lengths = np.array(lengths, dtype=np.float32)
+        passage_count = len(passages)
+        doc_freq = np.diff(offsets).astype(np.float32)
+        idf = np.log1p((passage_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        norm = k1 * (1 - b + b * lengths / lengths.mean()) if passage_count else lengths
+        weights = (idf[term_ids[order]] * tf * (k1 + 1) / (tf + norm[postings])).astype(np.float32)
+
+        return cls(passages, group_ids, vocabulary, np.array(groups, dtype=np.int32), postings, offsets, weights)
+
+    def save(self, directory: str, fingerprint: str):
+        """
+        Persist the postings and weights as .npy arrays; passages and vocabulary go into the manifest
+        """
+        save_arrays(
+            directory,
+            fingerprint,
+            {"groups": self.groups, "postings": self.postings, "offsets": self.offsets, "weights": self.weights},
+            {"passages": self.passages, "group_ids": self.group_ids, "vocabulary": list(self.vocabulary)},
+        )
+
+    @classmethod
+    def load(cls, directory: str, fingerprint: str) -> Optional["BM25Index"]:
+        """
+        Memory-map a persisted index; returns None when it is missing or was built from a different corpus
+        """
+        loaded = load_arrays(directory, fingerprint)
+        if loaded is None:
+            return None
+
+        arrays, manifest = loaded
+        passages = [tuple(passage) for passage in manifest["passages"]]
+        vocabulary = {token: term_id for term_id, token in enumerate(manifest["vocabulary"])}
+        return cls(passages, manifest["group_ids"], vocabulary, **arrays)
+
+    def search(self, query: str, top_k: int = 5, group: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Rank passages against the query
+
+        Returns up to top_k (passage id, score) pairs with a positive score, best first;
+        `group` restricts results to one document key prefix (region)
+        """
+        term_ids = {self.vocabulary[token] for token, _ in tokenize(query.lower()) if token in self.vocabulary}
+        if not term_ids or top_k <= 0:
+            return []
+
+        slices = [slice(self.offsets[term_id], self.offsets[term_id + 1]) for term_id in term_ids]
+        scores = np.bincount(
+            np.concatenate([self.postings[s] for s in slices]),
+            weights=np.concatenate([self.weights[s] for s in slices]),
+            minlength=len(self.passages),
+        )
+
+        if group is not None:
+            group_id = self.group_ids.get(group)
+            if group_id is None:
+                return []
+            scores[self.groups != group_id] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [(int(passage_id), float(scores[passage_id])) for passage_id in candidates]
@@ -0,0 +1,321 @@
+import re
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from app.common.index_store import load_arrays, save_arrays
+
+# Latin words/numbers are indexed as whole words, Japanese (kana, kanji, full-width forms) as character bigrams
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff10-\uff19\uff21-\uff3a\uff41-\uff5a\uff66-\uff9f]+")
+_TOKEN_PATTERN = re.compile(f"{_WORD_PATTERN.pattern}|{_CJK_PATTERN.pattern}")
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """
+    Split lowercased text into (token, offset) pairs: English words and Japanese character bigrams
+    """
+    tokens = []
+
+    for match in _TOKEN_PATTERN.finditer(text):
+        run = match.group()
+        start = match.start()
+
+        if _WORD_PATTERN.fullmatch(run):
+            tokens.append((run, start))
+        elif len(run) == 1:
+            tokens.append((run, start))
+        else:
+            for i in range(len(run) - 1):
+                tokens.append((run[i : i + 2], start + i))
+
+    return tokens
+
+
+class _PackedPostings(Mapping):
+    """
+    Read-only token -> {document key: positions} view over CSR postings arrays
+
+    A token is decoded on first access and kept, so only the vocabulary that queries touch is materialized
+    """
+
+    def __init__(self, tokens: List[str], doc_keys: List[str], token_offsets: np.ndarray, entry_docs: np.ndarray, entry_offsets: np.ndarray, positions: np.ndarray):
+        self._token_ids = {token: token_id for token_id, token in enumerate(tokens)}
+        self._doc_keys = doc_keys
+        self._token_offsets = token_offsets
+        self._entry_docs = entry_docs
+        self._entry_offsets = entry_offsets
+        self._positions = positions
+        self._decoded: Dict[str, Dict[str, List[int]]] = {}
+
+    def __getitem__(self, token: str) -> Dict[str, List[int]]:
+        decoded = self._decoded.get(token)
+        if decoded is None:
+            token_id = self._token_ids[token]
+            start, stop = int(self._token_offsets[token_id]), int(self._token_offsets[token_id + 1])
+            bounds = self._entry_offsets[start : stop + 1].tolist()
+            decoded = {
+                self._doc_keys[doc_id]: self._positions[bounds[i] : bounds[i + 1]].tolist()
+                for i, doc_id in enumerate(self._entry_docs[start:stop].tolist())
+            }
+            # Concurrent readers may decode the same token twice; both results are equal
+            self._decoded[token] = decoded
+        return decoded
+
+    def __contains__(self, token) -> bool:
+        return token in self._token_ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._token_ids)
+
+    def __len__(self) -> int:
+        return len(self._token_ids)
+
+
+class InvertedIndex:
+    """
+    Positional inverted index over a set of documents, answering case-insensitive substring queries
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, str] = {}
+        self.postings: Mapping[str, Dict[str, List[int]]] = {}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        self._vocabulary: Optional[Tuple[List[str], List[str], List[str]]] = None
+
+    def save(self, directory: str, fingerprint: str):
+        """
+        Persist the postings in CSR layout (token -> document entries -> positions) as .npy arrays
+        """
+        tokens = sorted(self.postings)
+        doc_ids = {key: doc_id for doc_id, key in enumerate(self.documents)}
+        token_offsets = [0]
+        entry_docs = []
+        entry_offsets = [0]
+        positions = []
+
+        for token in tokens:
+            for key, offsets in self.postings[token].items():
+                entry_docs.append(doc_ids[key])
+                positions.extend(offsets)
+                entry_offsets.append(len(positions))
+            token_offsets.append(len(entry_docs))
+
+        save_arrays(
+            directory,
+            fingerprint,
+            {
+                "token_offsets": np.array(token_offsets, dtype=np.int64),
+                "entry_docs": np.array(entry_docs, dtype=np.int32),
+                "entry_offsets": np.array(entry_offsets, dtype=np.int64),
+                "positions": np.array(positions, dtype=np.int32),
+            },
+            {"tokens": tokens, "documents": list(self.documents)},
+        )
+
+    @classmethod
+    def load(cls, directory: str, fingerprint: str, documents: Dict[str, str]) -> Optional["InvertedIndex"]:
+        """
+        Memory-map persisted postings for the given documents, in their original insertion order
+
+        Returns None when they are missing, were built from a different corpus or cover other documents
+        """
+        loaded = load_arrays(directory, fingerprint)
+        if loaded is None:
+            return None
+
+        arrays, manifest = loaded
+        doc_keys = manifest["documents"]
+        if set(doc_keys) != set(documents):
+            return None
+
+        index = cls()
+        index.documents = {key: documents[key].lower() for key in doc_keys}
+        index._order = {key: order for order, key in enumerate(doc_keys)}
+        index._next_order = len(doc_keys)
+        index.postings = _PackedPostings(manifest["tokens"], doc_keys, **arrays)
+        return index
+
+    def add_document(self, key: str, content: str):
+        """
+        Index a document, replacing any previous version stored under the same key
+        """
+        self._unpack_postings()
+        if key in self.documents:
+            self.remove_document(key)
+
+        text = content.lower()
+        self.documents[key] = text
+        self._order[key] = self._next_order
+        self._next_order += 1
+        self._vocabulary = None
+
+        for token, offset in tokenize(text):
+            self.postings.setdefault(token, {}).setdefault(key, []).append(offset)
+
+    def remove_document(self, key: str):
+        """
+        Drop a document and its postings from the index
+        """
+        if key not in self.documents:
+            return
+
+        self._unpack_postings()
+        text = self.documents.pop(key)
+
+        self._order.pop(key, None)
+        self._vocabulary = None
+        for token in {token for token, _ in tokenize(text)}:
+            doc_postings = self.postings.get(token)
+            if doc_postings is None:
+                continue
+            doc_postings.pop(key, None)
+            if not doc_postings:
+                del self.postings[token]
+
+    def _unpack_postings(self):
+        """
+        Turn loaded read-only postings into plain dicts before the index is modified
+        """
+        if isinstance(self.postings, _PackedPostings):
+            self.postings = {token: self.postings[token] for token in self.postings}
+
+    def search(self, query: str) -> List[Tuple[str, int]]:
+        """
+        Find documents containing the query as a substring
+
+        Returns (document key, first match offset) pairs in insertion order
+        """
+        query = query.lower()
+        if not query:
+            return [(key, 0) for key in self.documents]
+
+        exact, fragments = self._classify_query_tokens(query)
+
+        if exact:
+            candidates = self._exact_candidates(exact)
+        elif fragments:
+            candidates = self._fragment_candidates(*fragments[0])
+        else:
+            # No indexable token (punctuation only): fall back to scanning the pre-lowered texts
+            matches = []
+            for key, text in self.documents.items():
+                pos = text.find(query)
+                if pos != -1:
+                    matches.append((key, pos))
+            return matches
+
+        matches = {}
+        for key, starts in candidates.items():
+            text = self.documents[key]
+            for start in sorted(starts):
+                if start >= 0 and text.startswith(query, start):
+                    matches[key] = start
+                    break
+
+        return sorted(matches.items(), key=lambda item: self._order[item[0]])
+
+    def _classify_query_tokens(self, query: str) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int, str]]]:
+        """
+        Split query tokens into exact anchors and edge fragments that may only be part of a document token
+        """
+        exact = []
+        fragments = []
+
+        for token, offset in tokenize(query):
+            at_start = offset == 0
+            at_end = offset + len(token) == len(query)
+
+            if _WORD_PATTERN.fullmatch(token):
+                if at_start and at_end:
+                    fragments.append((token, offset, "contains"))
+                elif at_start:
+                    fragments.append((token, offset, "endswith"))
+                elif at_end:
+                    fragments.append((token, offset, "startswith"))
+                else:
+                    exact.append((token, offset))
+            elif len(token) == 1 and (at_start or at_end):
+                fragments.append((token, offset, "contains"))
+            else:
+                exact.append((token, offset))
+
+        return exact, fragments
+
+    def _exact_candidates(self, tokens: List[Tuple[str, int]]) -> Dict[str, Set[int]]:
+        """
+        Candidate match starts from the rarest exact token, restricted to documents holding every exact token
+        """
+        doc_keys: Optional[Set[str]] = None
+        for token, _ in tokens:
+            keys = set(self.postings.get(token, {}))
+            doc_keys = keys if doc_keys is None else doc_keys & keys
+            if not doc_keys:
+                return {}
+
+        anchor, anchor_offset = min(tokens, key=lambda item: sum(len(p) for p in self.postings[item[0]].values()))
+
+        return {key: {pos - anchor_offset for pos in self.postings[anchor][key]} for key in doc_keys}
+
+    def _fragment_candidates(self, fragment: str, offset: int, mode: str) -> Dict[str, Set[int]]:
+        """
+        Candidate match starts for a partial token, expanded through the vocabulary instead of the corpus
+        """
+        if mode == "endswith":
+            expansions = [(token, len(token) - len(fragment)) for token in self._tokens_with_suffix(fragment)]
+        elif mode == "startswith":
+            expansions = [(token, 0) for token in self._tokens_with_prefix(fragment)]
+        elif _WORD_PATTERN.fullmatch(fragment):
+            words = self._get_vocabulary()[0]
+            expansions = [(word, shift) for word in words if fragment in word for shift in self._find_all(word, fragment)]
+        else:
+            # A lone Japanese character is either a unigram or the first/second half of a bigram
+            expansions = [(token, 0) for token in self._tokens_with_prefix(fragment)]
+            expansions += [(token, len(token) - 1) for token in self._tokens_with_suffix(fragment) if len(token) > 1]
+
+        candidates: Dict[str, Set[int]] = {}
+        for token, shift in expansions:
+            for key, positions in self.postings[token].items():
+                candidates.setdefault(key, set()).update(pos + shift - offset for pos in positions)
+
+        return candidates
+
+    def _get_vocabulary(self) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Sorted views of the vocabulary (words, all tokens, reversed tokens), rebuilt lazily after index changes
+        """
+        if self._vocabulary is None:
+            tokens = sorted(self.postings)
+            words = [token for token in tokens if _WORD_PATTERN.fullmatch(token)]
+            reversed_tokens = sorted(token[::-1] for token in tokens)
+            self._vocabulary = (words, tokens, reversed_tokens)
+        return self._vocabulary
+
+    def _tokens_with_prefix(self, prefix: str) -> List[str]:
+        tokens = self._get_vocabulary()[1]
+        matched = []
+        for i in range(bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            matched.append(tokens[i])
+        return matched
+
+    def _tokens_with_suffix(self, suffix: str) -> List[str]:
+        reversed_tokens = self._get_vocabulary()[2]
+        reversed_suffix = suffix[::-1]
+        matched = []
+        for i in range(bisect_left(reversed_tokens, reversed_suffix), len(reversed_tokens)):
+            if not reversed_tokens[i].startswith(reversed_suffix):
+                break
+            matched.append(reversed_tokens[i][::-1])
+        return matched
+
+    @staticmethod
+    def _find_all(text: str, fragment: str) -> List[int]:
+        positions = []
+        pos = text.find(fragment)
+        while pos != -1:
+            positions.append(pos)
+            pos = text.find(fragment, pos + 1)
+        return positions
@@ -0,0 +1,36 @@
+import re
+from typing import Dict, List
+
+# Sentence boundaries: Japanese/full-width terminators, line breaks, and an English period followed by whitespace.
+# A bare "." is not a boundary, so decimals such as "6.6％" stay inside their sentence.
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[。！？!?])|\n+|(?<=\.)\s+")
+
+
+def segment_sentences(text: str) -> List[str]:
+    """
+    Split document text into non-empty sentences, keeping their terminators
+    """
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+class SentenceIndex:
+    """
+    A document pre-segmented into sentences, with a keyword -> sentence-id index for a fixed keyword set
+    """
+
+    def __init__(self, text: str, keywords: List[str]):
+        self.sentences = segment_sentences(text)
+        self.keyword_sentences: Dict[str, List[int]] = {keyword: [] for keyword in keywords}
+
+        for sentence_id, sentence in enumerate(self.sentences):
+            lowered = sentence.lower()
+            for keyword in keywords:
+                if keyword in lowered:
+                    self.keyword_sentences[keyword].append(sentence_id)
+
+    def first_sentence(self, keyword: str) -> str:
+        """
+        First sentence containing the keyword, or an empty string
+        """
+        sentence_ids = self.keyword_sentences.get(keyword)
+        return self.sentences[sentence_ids[0]] if sentence_ids else ""
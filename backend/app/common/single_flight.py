@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is running, other callers with
+    the same key wait for it and receive its result (or exception) instead of running it again
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._executions = 0
+        self._shared = 0
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await fn(*args, **kwargs) unless an identical call is already in flight on the loop, then share its outcome
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+            with self._lock:
+                self._executions += 1
+        else:
+            with self._lock:
+                self._shared += 1
+
+        # A cancelled caller must not cancel the call the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._tasks), "executions": self._executions, "shared": self._shared}
+
+
+class _Broadcast:
+    def __init__(self):
+        self.events: List[Dict] = []
+        self.finished = False
+        self.subscribers = 0
+        self.condition = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamBroadcaster:
+    """
+    Fans one upstream event stream out to every concurrent subscriber of the same key
+
+    A subscriber that joins late first receives the events already produced, then the live ones.
+    The upstream is cancelled when its last subscriber disconnects before it finishes.
+    """
+
+    def __init__(self):
+        self._broadcasts: Dict[Hashable, _Broadcast] = {}
+        self._started = 0
+        self._joined = 0
+
+    async def subscribe(self, key: Hashable, factory: Callable[[], AsyncGenerator[Dict, None]]) -> AsyncGenerator[Dict, None]:
+        """
+        Yield the events of the stream for key, starting it with factory() if none is running
+        """
+        broadcast = self._broadcasts.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._broadcasts[key] = broadcast
+            self._started += 1
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, factory()))
+        else:
+            self._joined += 1
+
+        broadcast.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with broadcast.condition:
+                    await broadcast.condition.wait_for(lambda: position < len(broadcast.events) or broadcast.finished)
+                    pending = broadcast.events[position:]
+                    finished = broadcast.finished
+
+                position += len(pending)
+                for event in pending:
+                    yield event
+                if finished and position >= len(broadcast.events):
+                    break
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.finished:
+                if self._broadcasts.get(key) is broadcast:
+                    del self._broadcasts[key]
+                broadcast.task.cancel()
+
+    async def _pump(self, key: Hashable, broadcast: _Broadcast, events: AsyncGenerator[Dict, None]):
+        try:
+            async for event in events:
+                async with broadcast.condition:
+                    broadcast.events.append(event)
+                    broadcast.condition.notify_all()
+        except asyncio.CancelledError:
+            await events.aclose()
+        except Exception as e:
+            broadcast.events.append({"type": "error", "data": str(e)})
+        finally:
+            if self._broadcasts.get(key) is broadcast:
+                del self._broadcasts[key]
+            async with broadcast.condition:
+                broadcast.finished = True
+                broadcast.condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._broadcasts), "started": self._started, "joined": self._joined}
@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+Runner = Callable[..., Awaitable[Any]]
+
+
+class StageTimer:
+    """
+    Runs the blocking stages of a request off the event loop and records how long each one took
+
+    Stages started together with asyncio.gather overlap, so the total approaches the slowest
+    branch rather than the sum of the stages
+    """
+
+    def __init__(self, run: Optional[Runner] = None):
+        # run(fn, *args) offloads a blocking call; BoundedExecutor.run in the API, a plain thread otherwise
+        self._run = run or asyncio.to_thread
+        self._started = time.perf_counter()
+        self.timings_ms: Dict[str, float] = {}
+
+    async def stage(self, name: str, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run fn(*args) through the runner and record its wall time under name
+        """
+        start = time.perf_counter()
+        try:
+            return await self._run(fn, *args)
+        finally:
+            self.timings_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def stage_sync(self, name: str, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run fn(*args) on the calling thread and record its wall time under name
+        """
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.timings_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def metadata(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage timings plus the elapsed total, for a response's metadata field
+        """
+        return {"timings_ms": {**self.timings_ms, "total": round((time.perf_counter() - self._started) * 1000, 1)}}
@@ -0,0 +1,79 @@
+import asyncio
+from typing import AsyncGenerator, AsyncIterator, Dict
+
+
+async def coalesce_content(events: AsyncIterator[Dict], interval_ms: float, max_chars: int) -> AsyncGenerator[Dict, None]:
+    """
+    Merge consecutive "content" events of a stream into fewer, larger events
+
+    The first content event is forwarded immediately; later text is buffered and flushed once
+    interval_ms has passed since the first buffered piece or max_chars are buffered. Any other
+    event type flushes the buffer and is forwarded as-is. interval_ms <= 0 disables coalescing.
+    """
+    if interval_ms <= 0:
+        async for event in events:
+            yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    interval = interval_ms / 1000
+    iterator = events.__aiter__()
+    pending = None
+    buffer = []
+    buffered_chars = 0
+    deadline = None
+    first_content_sent = False
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if not done:
+                # Flush interval elapsed while the upstream is still producing the next chunk
+                yield {"type": "content", "data": "".join(buffer)}
+                buffer, buffered_chars, deadline = [], 0, None
+                continue
+
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                break
+
+            if event.get("type") == "content":
+                if not first_content_sent:
+                    first_content_sent = True
+                    yield event
+                    continue
+
+                buffer.append(event.get("data", ""))
+                buffered_chars += len(buffer[-1])
+                if buffered_chars >= max_chars:
+                    yield {"type": "content", "data": "".join(buffer)}
+                    buffer, buffered_chars, deadline = [], 0, None
+                elif deadline is None:
+                    deadline = loop.time() + interval
+                continue
+
+            if buffer:
+                yield {"type": "content", "data": "".join(buffer)}
+                buffer, buffered_chars, deadline = [], 0, None
+            yield event
+
+        if buffer:
+            yield {"type": "content", "data": "".join(buffer)}
+
+    finally:
+        # Client went away mid-stream: stop the upstream generator instead of leaving it running
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except BaseException:
+                pass
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -16,6 +16,35 @@ if os.getenv("ENV", None) == "dev":
 
     config["OPENAI_API_ORG"] = os.getenv("OPENAI_API_ORG")
     config["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+    config["OPENAI_MAX_CONNECTIONS"] = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    config["OPENAI_MAX_CONCURRENT_STREAMS"] = int(os.getenv("OPENAI_MAX_CONCURRENT_STREAMS", "50"))
+    config["BLOCKING_POOL_WORKERS"] = int(os.getenv("BLOCKING_POOL_WORKERS", "16"))
+    config["BLOCKING_POOL_QUEUE"] = int(os.getenv("BLOCKING_POOL_QUEUE", "64"))
+    config["STREAM_FLUSH_INTERVAL_MS"] = float(os.getenv("STREAM_FLUSH_INTERVAL_MS", "30"))
+    config["STREAM_FLUSH_MAX_CHARS"] = int(os.getenv("STREAM_FLUSH_MAX_CHARS", "256"))
+    config["MESSAGE_STORE_BACKEND"] = os.getenv("MESSAGE_STORE_BACKEND", "memory")
+    config["MESSAGE_STORE_PATH"] = os.getenv("MESSAGE_STORE_PATH", "")
+    config["MESSAGE_STORE_MAX_ENTRIES"] = int(os.getenv("MESSAGE_STORE_MAX_ENTRIES", "10000"))
+    config["MESSAGE_STORE_MAX_BYTES"] = int(os.getenv("MESSAGE_STORE_MAX_BYTES", "67108864"))
+    config["MESSAGE_STORE_TTL_SECONDS"] = float(os.getenv("MESSAGE_STORE_TTL_SECONDS", "3600"))
+    config["ANSWER_CACHE_ENABLED"] = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    config["ANSWER_CACHE_BACKEND"] = os.getenv("ANSWER_CACHE_BACKEND", "memory")
+    config["ANSWER_CACHE_PATH"] = os.getenv("ANSWER_CACHE_PATH", "")
+    config["ANSWER_CACHE_MAX_ENTRIES"] = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    config["ANSWER_CACHE_MAX_BYTES"] = int(os.getenv("ANSWER_CACHE_MAX_BYTES", "33554432"))
+    config["ANSWER_CACHE_TTL_SECONDS"] = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    config["DIRECT_RESULT_PRECOMPUTE"] = os.getenv("DIRECT_RESULT_PRECOMPUTE", "false").lower() == "true"
+    config["DIRECT_RESULT_TABLE_PATH"] = os.getenv("DIRECT_RESULT_TABLE_PATH", "")
+
+    config["DOCX_INGEST_WORKERS"] = int(os.getenv("DOCX_INGEST_WORKERS", "0"))
+    config["DOCX_SNAPSHOT_CACHE"] = os.getenv("DOCX_SNAPSHOT_CACHE", "true").lower() == "true"
+    config["DOCX_RELOAD_INTERVAL"] = float(os.getenv("DOCX_RELOAD_INTERVAL", "0"))
+    config["DOCX_RETRIEVAL_MODE"] = os.getenv("DOCX_RETRIEVAL_MODE", "bm25")
+    config["DOCX_PASSAGE_SIZE"] = int(os.getenv("DOCX_PASSAGE_SIZE", "400"))
+    config["DOCX_EMBEDDING_DIM"] = int(os.getenv("DOCX_EMBEDDING_DIM", "512"))
+    config["DOCX_DENSE_NLIST"] = int(os.getenv("DOCX_DENSE_NLIST", "0"))
+    config["DOCX_DENSE_NPROBE"] = int(os.getenv("DOCX_DENSE_NPROBE", "4"))
+    config["CONTEXT_TOKEN_BUDGET"] = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
 
 else:
     config["ENV"] = os.getenv("ENV")
@@ -24,3 +53,32 @@ else:
 
     config["OPENAI_API_ORG"] = os.getenv("OPENAI_API_ORG")
     config["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+    config["OPENAI_MAX_CONNECTIONS"] = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    config["OPENAI_MAX_CONCURRENT_STREAMS"] = int(os.getenv("OPENAI_MAX_CONCURRENT_STREAMS", "50"))
+    config["BLOCKING_POOL_WORKERS"] = int(os.getenv("BLOCKING_POOL_WORKERS", "16"))
+    config["BLOCKING_POOL_QUEUE"] = int(os.getenv("BLOCKING_POOL_QUEUE", "64"))
+    config["STREAM_FLUSH_INTERVAL_MS"] = float(os.getenv("STREAM_FLUSH_INTERVAL_MS", "30"))
+    config["STREAM_FLUSH_MAX_CHARS"] = int(os.getenv("STREAM_FLUSH_MAX_CHARS", "256"))
+    config["MESSAGE_STORE_BACKEND"] = os.getenv("MESSAGE_STORE_BACKEND", "memory")
+    config["MESSAGE_STORE_PATH"] = os.getenv("MESSAGE_STORE_PATH", "")
+    config["MESSAGE_STORE_MAX_ENTRIES"] = int(os.getenv("MESSAGE_STORE_MAX_ENTRIES", "10000"))
+    config["MESSAGE_STORE_MAX_BYTES"] = int(os.getenv("MESSAGE_STORE_MAX_BYTES", "67108864"))
+    config["MESSAGE_STORE_TTL_SECONDS"] = float(os.getenv("MESSAGE_STORE_TTL_SECONDS", "3600"))
+    config["ANSWER_CACHE_ENABLED"] = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    config["ANSWER_CACHE_BACKEND"] = os.getenv("ANSWER_CACHE_BACKEND", "memory")
+    config["ANSWER_CACHE_PATH"] = os.getenv("ANSWER_CACHE_PATH", "")
+    config["ANSWER_CACHE_MAX_ENTRIES"] = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    config["ANSWER_CACHE_MAX_BYTES"] = int(os.getenv("ANSWER_CACHE_MAX_BYTES", "33554432"))
+    config["ANSWER_CACHE_TTL_SECONDS"] = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    config["DIRECT_RESULT_PRECOMPUTE"] = os.getenv("DIRECT_RESULT_PRECOMPUTE", "false").lower() == "true"
+    config["DIRECT_RESULT_TABLE_PATH"] = os.getenv("DIRECT_RESULT_TABLE_PATH", "")
+
+    config["DOCX_INGEST_WORKERS"] = int(os.getenv("DOCX_INGEST_WORKERS", "0"))
+    config["DOCX_SNAPSHOT_CACHE"] = os.getenv("DOCX_SNAPSHOT_CACHE", "true").lower() == "true"
+    config["DOCX_RELOAD_INTERVAL"] = float(os.getenv("DOCX_RELOAD_INTERVAL", "0"))
+    config["DOCX_RETRIEVAL_MODE"] = os.getenv("DOCX_RETRIEVAL_MODE", "bm25")
+    config["DOCX_PASSAGE_SIZE"] = int(os.getenv("DOCX_PASSAGE_SIZE", "400"))
+    config["DOCX_EMBEDDING_DIM"] = int(os.getenv("DOCX_EMBEDDING_DIM", "512"))
+    config["DOCX_DENSE_NLIST"] = int(os.getenv("DOCX_DENSE_NLIST", "0"))
+    config["DOCX_DENSE_NPROBE"] = int(os.getenv("DOCX_DENSE_NPROBE", "4"))
+    config["CONTEXT_TOKEN_BUDGET"] = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
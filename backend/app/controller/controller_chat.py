@@ -1,18 +1,44 @@
+import asyncio
+import hashlib
+import json
+import os
 import uuid
 from typing import Dict, Optional, List, AsyncGenerator
 from datetime import datetime
-import asyncio
+from app.common.answer_cache import normalize_text
+from app.common.bounded_executor import ExecutorSaturatedError
+from app.common.direct_result_table import DirectResultTable
+from app.common.message_store import create_message_store
 from app.common.openai import OpenAIHandler
+from app.common.single_flight import SingleFlight, StreamBroadcaster
+from app.common.stage_timer import Runner, StageTimer
 from app.common.web_search import WebSearchHandler
 from app.schemas.schema_chat import ChatQuestionRequest, ChatQuestionResponse, ChatAnswerRequest, ChatAnswerResponse
-from app.config import logger
+from app.config import config, logger
 
 
 class ChatController:
     def __init__(self):
         self.openai_handler = OpenAIHandler()
         self.web_search_handler = WebSearchHandler()
-        self.message_storage: Dict[str, Dict] = {}
+        self.single_flight = SingleFlight()
+        self.stream_broadcaster = StreamBroadcaster()
+
+        # Precomputed /data/direct-result bodies (built by `python -m app.build_direct_results` or at startup)
+        self.direct_results = DirectResultTable(
+            config.get("DIRECT_RESULT_TABLE_PATH", "")
+            or os.path.join(self.openai_handler.docx_processor.data_dir, ".cache", "direct_results.json")
+        )
+        self.direct_results.load()
+        if config.get("DIRECT_RESULT_PRECOMPUTE", False) and self.direct_results.corpus_hash != self.openai_handler.docx_processor.corpus_hash:
+            self.build_direct_results()
+        self.message_storage = create_message_store(
+            backend=config.get("MESSAGE_STORE_BACKEND", "memory"),
+            path=config.get("MESSAGE_STORE_PATH", ""),
+            max_entries=config.get("MESSAGE_STORE_MAX_ENTRIES", 10000),
+            max_bytes=config.get("MESSAGE_STORE_MAX_BYTES", 64 * 1024 * 1024),
+            ttl_seconds=config.get("MESSAGE_STORE_TTL_SECONDS", 3600),
+        )
 
     def process_question(self, request: ChatQuestionRequest) -> ChatQuestionResponse:
         """
@@ -21,71 +47,63 @@ class ChatController:
         try:
             message_id = str(uuid.uuid4())
 
-            self.message_storage[message_id] = {
-                "question": request.message,
-                "conversation_history": request.conversation_history,
-                "timestamp": datetime.now(),
-                "status": "pending",
-            }
+            self.message_storage.put(
+                message_id,
+                {
+                    "question": request.message,
+                    # Plain role/content pairs so every backend can serialize the history compactly
+                    "conversation_history": [{"role": msg.role, "content": msg.content} for msg in request.conversation_history or []],
+                    "timestamp": datetime.now(),
+                    "status": "pending",
+                },
+            )
             return ChatQuestionResponse(message_id=message_id, status="received", message="Question received successfully")
 
         except Exception as e:
             logger.write_error(f"Error processing question: {str(e)}")
             raise Exception(f"Failed to process question: {str(e)}") from e
 
-    def generate_answer(self, request: ChatAnswerRequest) -> ChatAnswerResponse:
+    async def generate_answer(self, request: ChatAnswerRequest, run: Optional[Runner] = None) -> ChatAnswerResponse:
         """
         Generate an answer for a previously submitted question with data analysis
+
+        run offloads the blocking store and OpenAI calls (a thread by default)
         """
+        run = run or asyncio.to_thread
         try:
-            if request.message_id not in self.message_storage:
-                raise ValueError("Message ID not found")
-
-            message_data = self.message_storage[request.message_id]
-
-            messages = []
-
-            for msg in message_data["conversation_history"]:
-                messages.append({"role": msg.role, "content": msg.content})
+            messages = await run(self._conversation_messages, request.message_id)
 
-            messages.append({"role": "user", "content": message_data["question"]})
+            # Generate answer with data context; identical conversations in flight share one completion
+            # (coalesced before offloading, so waiting followers do not hold pool threads)
+            answer = await self.single_flight.do_async(("answer", self._conversation_key(messages)), run, self.openai_handler.chat_completion, messages)
 
-            # Generate answer with data context
-            answer = self.openai_handler.chat_completion(messages)
-
-            self.message_storage[request.message_id]["answer"] = answer
-            self.message_storage[request.message_id]["status"] = "completed"
-            self.message_storage[request.message_id]["answer_timestamp"] = datetime.now()
+            await run(self._complete_message, request.message_id, answer)
 
             return ChatAnswerResponse(message_id=request.message_id, answer=answer, status="completed", timestamp=datetime.now())
 
+        except ExecutorSaturatedError:
+            raise
         except Exception as e:
             logger.write_error(f"Error generating answer: {str(e)}")
             raise Exception(f"Failed to generate answer: {str(e)}") from e
 
-    async def generate_answer_stream(self, request: ChatAnswerRequest) -> AsyncGenerator[Dict, None]:
+    async def generate_answer_stream(self, request: ChatAnswerRequest, run: Optional[Runner] = None) -> AsyncGenerator[Dict, None]:
         """
         Generate a streaming answer for a previously submitted question
+
+        run offloads the blocking message store calls (a thread by default)
         """
+        run = run or asyncio.to_thread
         try:
-            if request.message_id not in self.message_storage:
-                raise ValueError("Message ID not found")
-
-            message_data = self.message_storage[request.message_id]
-
-            messages = []
-            for msg in message_data["conversation_history"]:
-                messages.append({"role": msg.role, "content": msg.content})
-
-            messages.append({"role": "user", "content": message_data["question"]})
+            messages = await run(self._conversation_messages, request.message_id)
 
             # Send initial status
             yield {"type": "status", "data": "Starting analysis..."}
-            await asyncio.sleep(0.1)
 
-            # Generate streaming answer
+            # Generate streaming answer; concurrent subscribers of an identical conversation share one upstream stream
             full_answer = ""
-            async for chunk in self.openai_handler.chat_completion_stream(messages):
+            chunks = self.stream_broadcaster.subscribe(self._conversation_key(messages), lambda: self.openai_handler.chat_completion_stream(messages))
+            async for chunk in chunks:
                 if chunk.get("type") == "content":
                     full_answer += chunk.get("data", "")
                     yield {"type": "content", "data": chunk.get("data", "")}
@@ -98,9 +116,7 @@ class ChatController:
                     return
 
             # Update storage with complete answer
-            self.message_storage[request.message_id]["answer"] = full_answer
-            self.message_storage[request.message_id]["status"] = "completed"
-            self.message_storage[request.message_id]["answer_timestamp"] = datetime.now()
+            await run(self._complete_message, request.message_id, full_answer)
 
             yield {"type": "complete", "data": "Analysis completed"}
 
@@ -108,6 +124,33 @@ class ChatController:
             logger.write_error(f"Error generating streaming answer: {str(e)}")
             yield {"type": "error", "data": str(e)}
 
+    def _conversation_messages(self, message_id: str) -> List[Dict[str, str]]:
+        """
+        Stored conversation history plus the question of a submitted message, as OpenAI messages
+        """
+        message_data = self.message_storage.get(message_id)
+        if message_data is None:
+            raise ValueError("Message ID not found")
+
+        messages = []
+
+        for msg in message_data["conversation_history"]:
+            messages.append({"role": msg["role"], "content": msg["content"]})
+
+        messages.append({"role": "user", "content": message_data["question"]})
+        return messages
+
+    def _complete_message(self, message_id: str, answer: str):
+        self.message_storage.update(message_id, answer=answer, status="completed", answer_timestamp=datetime.now())
+
+    def _conversation_key(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Coalescing key of a conversation: normalized messages at the current corpus version
+        """
+        payload = [[message["role"], normalize_text(message["content"])] for message in messages]
+        payload.append(self.openai_handler.docx_processor.corpus_version)
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
     def get_data_summary(self) -> Dict:
         """
         Get a summary of available market data
@@ -178,19 +221,25 @@ class ChatController:
             logger.write_error(f"Error in web search: {str(e)}")
             raise Exception(f"Failed to perform web search: {str(e)}") from e
 
-    def generate_enhanced_analysis(self, query: str, region: Optional[str] = None, product_category: Optional[str] = None) -> Dict:
+    async def generate_enhanced_analysis(
+        self, query: str, region: Optional[str] = None, product_category: Optional[str] = None, run: Optional[Runner] = None
+    ) -> Dict:
         """
         Generate enhanced analysis combining DOCX documents and web search data
+
+        The DOCX analysis and the web search branch run concurrently; run offloads each blocking stage
         """
         try:
-            # Get DOCX analysis
-            docx_analysis = self.openai_handler.analyze_market_trend(region, product_category)
+            timer = StageTimer(run)
 
-            # Get web search data
-            web_search_results = self.web_search_handler.search_market_data(query, region, product_category)
+            async def web_branch():
+                web_search_results = await timer.stage("web_search", self.web_search_handler.search_market_data, query, region, product_category)
+                enhanced_content = await timer.stage("enhanced_content", self.web_search_handler.generate_docx_content, web_search_results)
+                return web_search_results, enhanced_content
 
-            # Generate enhanced content
-            enhanced_content = self.web_search_handler.generate_docx_content(web_search_results)
+            docx_analysis, (web_search_results, enhanced_content) = await asyncio.gather(
+                timer.stage("docx_analysis", self.openai_handler.analyze_market_trend, region, product_category), web_branch()
+            )
 
             return {
                 "docx_analysis": docx_analysis,
@@ -210,7 +259,10 @@ class ChatController:
                         docx_analysis.get("analysis", {}).get("City & Nature", ""), web_search_results.get("results", [])
                     ),
                 },
+                "metadata": timer.metadata(),
             }
+        except ExecutorSaturatedError:
+            raise
         except Exception as e:
             logger.write_error(f"Error generating enhanced analysis: {str(e)}")
             raise Exception(f"Failed to generate enhanced analysis: {str(e)}") from e
@@ -248,50 +300,115 @@ class ChatController:
             logger.write_error(f"Error getting category mapping: {str(e)}")
             raise Exception(f"Failed to get category mapping: {str(e)}") from e
 
-    def get_direct_result(self, category: str, subcategory: str, country: str) -> Dict:
+    def build_direct_results(self) -> int:
+        """
+        Materialize the direct result of every category x subcategory x country and save the table
+
+        Returns the number of combinations
+        """
+        try:
+            corpus_hash = self.openai_handler.docx_processor.corpus_hash
+            results = {}
+            for category, subcategories in self.get_category_subcategory_mapping().items():
+                for subcategory in subcategories:
+                    for country in self.get_available_countries():
+                        results[(category, subcategory, country)] = self._build_direct_result(category, subcategory, country)
+
+            self.direct_results.build(results, corpus_hash)
+            self.direct_results.save()
+            return len(results)
+        except Exception as e:
+            logger.write_error(f"Error building direct results: {str(e)}")
+            raise Exception(f"Failed to build direct results: {str(e)}") from e
+
+    def get_direct_result_body(self, category: str, subcategory: str, country: str) -> Optional[bytes]:
+        """
+        Precomputed JSON body of a direct result, or None when the table is missing, stale or lacks the combination
+        """
+        if self.direct_results.corpus_hash != self.openai_handler.docx_processor.corpus_hash:
+            return None
+        return self.direct_results.lookup(category, subcategory, country)
+
+    async def get_direct_result(self, category: str, subcategory: str, country: str, run: Optional[Runner] = None) -> Dict:
         """
         Get direct result without LLM processing - just chart config and data
+
+        Chart config, market analysis and competitive analysis are computed concurrently, and
+        concurrent identical requests share one computation
+        """
+        return await self.single_flight.do_async(
+            ("direct_result", category, subcategory, country), self._gather_direct_result, category, subcategory, country, run
+        )
+
+    async def _gather_direct_result(self, category: str, subcategory: str, country: str, run: Optional[Runner] = None) -> Dict:
+        """
+        Run the direct result stages concurrently and attach their timings as metadata
         """
         try:
-            # Get chart configuration directly
-            chart_config = self.openai_handler.get_echarts_config(category)
+            timer = StageTimer(run)
+            region = None if country == "全て" else country
+            chart_config, market_analysis, competitive_analysis = await asyncio.gather(
+                timer.stage("chart_config", self.openai_handler.get_echarts_config, category),
+                timer.stage("market_analysis", self.openai_handler.analyze_market_trend, region, category),
+                timer.stage("competitive_analysis", self.openai_handler.get_competitive_analysis, region),
+            )
 
-            # Handle "全て" (All) selection
-            if country == "全て":
-                # Get market data analysis for all regions
-                market_analysis = self.openai_handler.analyze_market_trend(None, category)
-                # Get competitive analysis for all regions
-                competitive_analysis = self.openai_handler.get_competitive_analysis(None)
-                country_display = "All Regions"
-            else:
-                # Get market data analysis for specific country
-                market_analysis = self.openai_handler.analyze_market_trend(country, category)
-                # Get competitive analysis for specific country
-                competitive_analysis = self.openai_handler.get_competitive_analysis(country)
-                country_display = country
+            result = self._direct_result(category, subcategory, country, chart_config, market_analysis, competitive_analysis)
+            result["metadata"] = timer.metadata()
+            return result
+        except ExecutorSaturatedError:
+            raise
+        except Exception as e:
+            logger.write_error(f"Error getting direct result: {str(e)}")
+            raise Exception(f"Failed to get direct result: {str(e)}") from e
 
-            # Create direct result without LLM processing
-            result = {
-                "category": category,
-                "subcategory": subcategory,
-                "country": country,
-                "country_display": country_display,
-                "chart_config": chart_config,
-                "market_analysis": market_analysis,
-                "competitive_analysis": competitive_analysis,
-                "summary": {
-                    "title": f"{category} ({subcategory}) Market Analysis in {country_display}",
-                    "description": f"Direct market analysis for {category} - {subcategory} in {country_display}",
-                    "data_sources": ["DOCX Documents", "Market Research Reports"],
-                    "last_updated": "2025-01-16",
-                },
-            }
+    def _build_direct_result(self, category: str, subcategory: str, country: str) -> Dict:
+        """
+        Build the direct result sequentially on the calling thread, for the precomputed table
 
+        Same shape as the concurrent path; its metadata records the stage timings of this build
+        """
+        try:
+            timer = StageTimer()
+            region = None if country == "全て" else country
+            result = self._direct_result(
+                category,
+                subcategory,
+                country,
+                timer.stage_sync("chart_config", self.openai_handler.get_echarts_config, category),
+                timer.stage_sync("market_analysis", self.openai_handler.analyze_market_trend, region, category),
+                timer.stage_sync("competitive_analysis", self.openai_handler.get_competitive_analysis, region),
+            )
+            result["metadata"] = timer.metadata()
             return result
         except Exception as e:
             logger.write_error(f"Error getting direct result: {str(e)}")
             raise Exception(f"Failed to get direct result: {str(e)}") from e
 
+    def _direct_result(self, category: str, subcategory: str, country: str, chart_config: Dict, market_analysis: Dict, competitive_analysis: Dict) -> Dict:
+        """
+        Assemble the direct result response from its stage outputs
+        """
+        # "全て" (All) covers every region
+        country_display = "All Regions" if country == "全て" else country
+
+        # Create direct result without LLM processing
+        return {
+            "category": category,
+            "subcategory": subcategory,
+            "country": country,
+            "country_display": country_display,
+            "chart_config": chart_config,
+            "market_analysis": market_analysis,
+            "competitive_analysis": competitive_analysis,
+            "summary": {
+                "title": f"{category} ({subcategory}) Market Analysis in {country_display}",
+                "description": f"Direct market analysis for {category} - {subcategory} in {country_display}",
+                "data_sources": ["DOCX Documents", "Market Research Reports"],
+                "last_updated": "2025-01-16",
+            },
+        }
+
     def get_available_countries(self) -> List[str]:
         """
         Get all available countries/regions for selection
@@ -303,9 +420,19 @@ class ChatController:
             logger.write_error(f"Error getting available countries: {str(e)}")
             return []
 
-    def get_llm_analysis(self, category: str, subcategory: str, country: str) -> Dict:
+    async def get_llm_analysis(self, category: str, subcategory: str, country: str, run: Optional[Runner] = None) -> Dict:
         """
         Get LLM analysis with chart config for selected category, subcategory, and country
+
+        Concurrent identical requests share one OpenAI call; only that call is handed to run (a thread by default)
+        """
+        return await self.single_flight.do_async(
+            ("llm_analysis", category, subcategory, country), run or asyncio.to_thread, self._build_llm_analysis, category, subcategory, country
+        )
+
+    def _build_llm_analysis(self, category: str, subcategory: str, country: str) -> Dict:
+        """
+        Build the LLM analysis for get_llm_analysis
         """
         try:
             # Handle "全て" (All) selection
@@ -324,10 +451,10 @@ class ChatController:
             # Process the question through LLM
             response = self.process_question(question_request)
 
-            # Get the answer with LLM analysis
-            answer_request = ChatAnswerRequest(message_id=response.message_id)
-
-            llm_response = self.generate_answer(answer_request)
+            # Get the answer with LLM analysis; this already runs on the blocking pool, so the OpenAI call is made inline
+            answer = self.openai_handler.chat_completion(self._conversation_messages(response.message_id))
+            self._complete_message(response.message_id, answer)
+            llm_response = ChatAnswerResponse(message_id=response.message_id, answer=answer, status="completed", timestamp=datetime.now())
 
             # Get chart configuration
             chart_config = self.openai_handler.get_echarts_config(category)
@@ -1,9 +1,17 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import api_chat
 
 
-app = FastAPI(title="Panasonic Demo", docs_url="/api/docs")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    api_chat.blocking_executor.shutdown()
+    await api_chat.chat_controller.openai_handler.aclose()
+
+
+app = FastAPI(title="Panasonic Demo", docs_url="/api/docs", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
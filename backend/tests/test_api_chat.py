@@ -0,0 +1,23 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from fastapi.testclient import TestClient
+from app.api import api_chat
+from app.main import app
+
+
+def test_llm_analysis_returns_answer_and_chart(monkeypatch):
+    handler = api_chat.chat_controller.openai_handler
+    monkeypatch.setattr(handler, "chat_completion", lambda messages, model="gpt-5-chat-latest": "analysis for " + messages[-1]["content"][:11])
+    monkeypatch.setattr(handler, "get_echarts_config", lambda category, *args: {"title": {"text": category}})
+
+    with TestClient(app) as client:
+        response = client.get("/api/chat/data/llm-analysis", params={"category": "エアコン", "subcategory": "壁掛け", "country": "Vietnam"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["llm_response"]["answer"] == "analysis for Analyze the"
+    assert body["llm_response"]["status"] == "completed"
+    assert body["chart_config"] == {"title": {"text": "エアコン"}}
+    assert body["country_display"] == "Vietnam"